@@ -0,0 +1,120 @@
+from functools import partial
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.utils.functional import SimpleLazyObject
+
+from .models import Profile
+
+# Signals drop these entries on every save, so the timeout only bounds how
+# long another process's local-memory cache can serve a stale copy
+TIMEOUT = 5 * 60
+# What a request needs of the user. The password hash is never cached: the
+# cache may be files on disk shared by every worker
+USER_FIELDS = [f.attname for f in User._meta.concrete_fields if f.attname != 'password']
+
+
+def user_key(user_id):
+    return f"auth:user:{user_id}"
+
+
+def profile_key(user_id):
+    return f"auth:profile:{user_id}"
+
+
+def _cached_hash(session_hash):
+    return session_hash
+
+
+def _from_cache(values, session_hash):
+    # password is left deferred: reading it (a password check) loads it, and
+    # save() only writes the fields that were loaded, so it is never blanked
+    user = User.from_db(User._default_manager.db, USER_FIELDS, values)
+    # All that verifying the session needs of the password, for the current
+    # SECRET_KEY; the fallback keys still load it
+    user.get_session_auth_hash = partial(_cached_hash, session_hash)
+    return user
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend whose per-request user lookup is served from the cache.
+
+    Logging in still checks the password against the database; only get_user,
+    which AuthenticationMiddleware runs on every request, is cached, as the
+    USER_FIELDS values plus the session auth hash.
+    """
+
+    def get_user(self, user_id):
+        key = user_key(user_id)
+        cached = cache.get(key)
+        if cached is None:
+            user = User._default_manager.filter(pk=user_id).first()
+            if user is None:
+                return None
+            cached = [getattr(user, name) for name in USER_FIELDS], user.get_session_auth_hash()
+            cache.set(key, cached, TIMEOUT)
+        user = _from_cache(*cached)
+        return user if self.user_can_authenticate(user) else None
+
+
+def cached_profile(user):
+    """The user's Profile from the cache, or None if they have none (yet)."""
+    if not user.is_authenticated:
+        return None
+    key = profile_key(user.pk)
+    profile = cache.get(key)
+    if profile is None:
+        profile = Profile.objects.filter(user_id=user.pk).first()
+        if profile is None:
+            return None
+        cache.set(key, profile, TIMEOUT)
+    # Share the request's user so profile.user costs no query
+    profile.user = user
+    return profile
+
+
+async def acached_profile(user):
+    """cached_profile() for async views."""
+    if not user.is_authenticated:
+        return None
+    key = profile_key(user.pk)
+    profile = await cache.aget(key)
+    if profile is None:
+        profile = await Profile.objects.filter(user_id=user.pk).afirst()
+        if profile is None:
+            return None
+        await cache.aset(key, profile, TIMEOUT)
+    profile.user = user
+    return profile
+
+
+def invalidate_user(user_id):
+    cache.delete_many([user_key(user_id), profile_key(user_id)])
+
+
+def invalidate_profile(user_id):
+    cache.delete(profile_key(user_id))
+
+
+class ProfileMiddleware:
+    """Attach request.profile: the user's cached Profile, loaded on first use.
+
+    It is falsy when the user has no profile. Goes after
+    AuthenticationMiddleware. Async views should await
+    acached_profile(request.user) instead, since a cache miss queries the
+    database.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        # Returns the coroutine unawaited on the async path; the handler awaits it
+        request.profile = SimpleLazyObject(lambda: cached_profile(request.user))
+        return self.get_response(request)
@@ -1,6 +1,10 @@
 from django.contrib import admin
-from django.core.mail import send_mail
-from .models import Donation, Campaign, Profile,Organization
+from django.core.exceptions import PermissionDenied
+from django.template.response import TemplateResponse
+from django.urls import path
+from .forms import DonationImportForm
+from .models import ArchivedDonation, Donation, Campaign, Profile,Organization, OutboxEmail, DonationDailyRollup
+from . import approvals, imports
 
 
 @admin.register(Organization)
@@ -16,34 +20,78 @@ class DonationAdmin(admin.ModelAdmin):
     actions = ['approve_donations', 'reject_donations']
 
     def approve_donations(self, request, queryset):
-        for donation in queryset:
-            donation.is_approved = True
-            donation.is_rejected = False
-            donation.save()
-
-            send_mail(
-                subject='Donation Confirmation ✔️',
-                message=f"Dear {donation.name},\n\nThank you for your donation of ₹{donation.amount} "
-                        f"to '{donation.campaign.title}'. We appreciate your support.",
-                from_email=None,
-                recipient_list=[donation.email],
-                fail_silently=False,
-            )
-        self.message_user(request, "Selected donations approved and emails sent ✅")
+        approved = approvals.approve_donations(queryset.values_list('id', flat=True))
+        self.message_user(request, f"{len(approved)} donations approved and emails queued ✅")
 
     def reject_donations(self, request, queryset):
-        queryset.update(is_approved=False, is_rejected=True)
-        self.message_user(request, "Selected donations rejected ❌")
+        rejected = approvals.reject_donations(queryset.values_list('id', flat=True))
+        self.message_user(request, f"{len(rejected)} donations rejected ❌")
 
-    approve_donations.short_description = "✅ Approve selected donations & send email"
+    approve_donations.short_description = "✅ Approve selected donations & queue email"
     reject_donations.short_description = "❌ Reject selected donations"
 
+    def get_urls(self):
+        return [
+            path('import/', self.admin_site.admin_view(self.import_view), name='DonationsApp_donation_import'),
+        ] + super().get_urls()
+
+    def import_view(self, request):
+        # Offline and in-kind donations from a CSV/XLSX sheet; see imports.py
+        if not self.has_add_permission(request):
+            raise PermissionDenied
+        report = None
+        form = DonationImportForm(request.POST or None, request.FILES or None)
+        if request.method == 'POST' and form.is_valid():
+            upload = form.cleaned_data['file']
+            try:
+                report = imports.import_donations(
+                    imports.read_rows(upload, upload.name), dry_run=form.cleaned_data['dry_run'],
+                )
+            except ValueError as e:
+                form.add_error('file', str(e))
+        return TemplateResponse(request, 'admin/DonationsApp/donation/import.html', {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': "Import offline donations",
+            'form': form,
+            'report': report,
+            'columns': imports.COLUMNS,
+        })
+
+
+@admin.register(ArchivedDonation)
+class ArchivedDonationAdmin(admin.ModelAdmin):
+    # Settled history, moved here by the archive_donations command; read-only
+    list_display = ('name', 'email', 'campaign', 'donation_type', 'amount', 'is_approved', 'donated_at', 'archived_at')
+    list_filter = ('donation_type', 'is_approved', 'is_rejected')
+    date_hierarchy = 'donated_at'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
 
 @admin.register(Campaign)
 class CampaignAdmin(admin.ModelAdmin):
-    list_display = ('title', 'category', 'goal_amount', 'collected_amount', 'created_by')
+    list_display = ('title', 'category', 'goal_amount', 'collected_amount', 'donor_count', 'pending_count', 'last_donation_at', 'created_by')
+    readonly_fields = ('donor_count', 'pending_count', 'last_donation_at')
 
 
 @admin.register(Profile)
 class ProfileAdmin(admin.ModelAdmin):
     list_display = ('user', 'role', 'phone', 'gender', 'address')
+
+
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'recipients', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('status',)
+
+
+@admin.register(DonationDailyRollup)
+class DonationDailyRollupAdmin(admin.ModelAdmin):
+    list_display = ('day', 'campaign', 'category', 'money_count', 'money_amount', 'goods_count', 'goods_amount')
+    list_filter = ('category',)
+    date_hierarchy = 'day'
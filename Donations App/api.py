@@ -0,0 +1,175 @@
+"""Read-only JSON API (v1) over campaigns, organizations and donations.
+
+Rows are read with .values() and serialized straight from dicts, so a
+request builds no model instances; ?fields=a,b narrows the SELECT itself.
+Listings are keyset-paginated: campaigns and organizations on id with
+?after=<id>, donations on (donated_at, id) with the same opaque cursors as
+the HTML listings. Every endpoint is wrapped in conditional(), so a client
+that sends back its ETag gets a 304 without a listing query.
+"""
+from functools import wraps
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F
+from django.http import JsonResponse
+from django.views.decorators.http import require_safe
+
+from . import archive, caching
+from .conditional import conditional
+from .models import Campaign, Organization
+from .pagination import paginate_across
+from .querybudget import query_budget
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+CAMPAIGN_FIELDS = {
+    'id': 'id', 'title': 'title', 'description': 'description', 'category': 'category',
+    'goal_amount': 'goal_amount', 'collected_amount': 'collected_amount', 'donor_count': 'donor_count',
+    'pending_count': 'pending_count', 'last_donation_at': 'last_donation_at',
+}
+ORGANIZATION_FIELDS = {'id': 'id', 'name': 'name', 'website_url': 'website_url', 'category': 'category'}
+# Values are what .values() selects: a column name or an expression
+DONATION_FIELDS = {
+    'id': 'id', 'name': 'name', 'campaign_id': 'campaign_id', 'campaign_title': F('campaign__title'),
+    'donation_type': 'donation_type', 'amount': 'amount', 'donated_at': 'donated_at',
+}
+MY_DONATION_FIELDS = {
+    **DONATION_FIELDS, 'purpose': 'purpose', 'is_approved': 'is_approved', 'is_rejected': 'is_rejected',
+}
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _json(data, status=200):
+    return JsonResponse(
+        data, status=status, encoder=DjangoJSONEncoder, json_dumps_params={'separators': (',', ':')},
+    )
+
+
+def api_view(view_func):
+    """Answer ApiError with {"error": ...} instead of an HTML error page."""
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view_func(request, *args, **kwargs)
+        except ApiError as e:
+            return _json({'error': str(e)}, e.status)
+    return wrapper
+
+
+def login_required(view_func):
+    """Like auth's login_required, but a 401 for API clients instead of a redirect."""
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return _json({'error': "Authentication required."}, 401)
+        return view_func(request, *args, **kwargs)
+    return wrapper
+
+
+def _fields(request, allowed):
+    """{output name: column or expression} for ?fields=, defaulting to all of allowed. id always comes back."""
+    raw = request.GET.get('fields')
+    if not raw:
+        return dict(allowed)
+    names = ['id'] + [name.strip() for name in raw.split(',') if name.strip()]
+    unknown = [name for name in names if name not in allowed]
+    if unknown:
+        raise ApiError(f"Unknown field(s): {', '.join(unknown)}. Choose from: {', '.join(allowed)}.")
+    return {name: allowed[name] for name in names}
+
+
+def _limit(request):
+    try:
+        limit = int(request.GET.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        raise ApiError("limit must be a whole number.")
+    return max(1, min(limit, MAX_LIMIT))
+
+
+def _after_id(request):
+    try:
+        return int(request.GET.get('after', 0)) or None
+    except ValueError:
+        raise ApiError("after must be an id from next_cursor.")
+
+
+def _with_campaigns(version):
+    """version, moved on by campaign edits too: donation rows carry campaign_title."""
+    @wraps(version)
+    def stamp(*args):
+        return max(version(*args), caching.campaigns_version())
+    return stamp
+
+
+def _values(queryset, fields):
+    """queryset.values() for fields, aliasing the expressions to their output names."""
+    columns = [name for name, source in fields.items() if source == name]
+    expressions = {name: source for name, source in fields.items() if source != name}
+    return queryset.values(*columns, **expressions)
+
+
+def _by_id(request, queryset, allowed):
+    """Newest-first page of queryset with an id cursor; new rows never shift later pages."""
+    fields, limit, after = _fields(request, allowed), _limit(request), _after_id(request)
+    if after:
+        queryset = queryset.filter(pk__lt=after)
+    rows = list(_values(queryset.order_by('-pk'), fields)[:limit + 1])
+    results = rows[:limit]
+    return _json({
+        'results': results,
+        'next_cursor': str(results[-1]['id']) if len(rows) > limit else None,
+    })
+
+
+def _donations(request, querysets, allowed):
+    fields = _fields(request, allowed)
+    # The cursor needs donated_at; leave it out of the results if not asked for
+    selected = {**fields, 'donated_at': 'donated_at'}
+    page = paginate_across(request, [_values(qs, selected) for qs in querysets], 'donated_at', _limit(request))
+    results = page.items
+    if 'donated_at' not in fields:
+        results = [{name: row[name] for name in fields} for row in results]
+    return _json({'results': results, 'next_cursor': page.next_cursor, 'prev_cursor': page.prev_cursor})
+
+
+@query_budget(3)  # session, user, one page query
+@require_safe
+@conditional(caching.campaigns_version)
+@api_view
+def campaigns(request, category=None):
+    if category is not None and category not in caching.CATEGORIES:
+        raise ApiError("Unknown campaign category.", 404)
+    queryset = Campaign.objects.all() if category is None else Campaign.objects.filter(category=category)
+    return _by_id(request, queryset, CAMPAIGN_FIELDS)
+
+
+@query_budget(3)  # session, user, one page query
+@require_safe
+@conditional(caching.organizations_version)
+@api_view
+def organizations(request):
+    return _by_id(request, Organization.objects.all(), ORGANIZATION_FIELDS)
+
+
+@query_budget(4)  # session, user, one page query each on the hot and archive tables
+@require_safe
+@login_required
+@conditional(_with_campaigns(caching.approved_version))
+@api_view
+def approved_donations(request):
+    return _donations(request, archive.querysets(is_approved=True, is_rejected=False), DONATION_FIELDS)
+
+
+@query_budget(4)  # session, user, one page query each on the hot and archive tables
+@require_safe
+@login_required
+@conditional(_with_campaigns(caching.user_donations_version), per_user=True)
+@api_view
+def my_donations(request):
+    return _donations(request, archive.querysets(user=request.user), MY_DONATION_FIELDS)
@@ -0,0 +1,132 @@
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+
+from . import caching, counters, ledger, outbox, rollups
+from .models import Donation
+
+MAX_RETRIES = 5
+CHUNK_SIZE = 500  # stays under SQLite's bound-parameter limit
+
+APPROVED_SUBJECT = 'Donation Approved ✅'
+APPROVED_BODY = (
+    'Dear {name},\n\nThank you for your generous donation towards {title}. '
+    'Your donation has been approved.\n\nRegards,\nDonations Team'
+)
+REJECTED_SUBJECT = 'Donation Rejected ❌'
+REJECTED_BODY = (
+    'Dear {name},\n\nUnfortunately, your donation towards {title} has been rejected. '
+    'For any queries, please contact us.\n\nRegards,\nDonations Team'
+)
+
+
+class _Conflict(Exception):
+    """Another transaction settled some of the rows we were about to change."""
+
+
+def approve_donations(donation_ids):
+    """Approve pending or rejected donations in one transaction.
+
+    Credits each affected campaign once with the summed amount and queues one
+    mail per donation. Donations that are already approved are skipped.
+    Returns the list of donation ids this call approved.
+    """
+    return _settle(donation_ids, approve=True)
+
+
+def reject_donations(donation_ids):
+    """Reject pending or approved donations, reversing credits of approved ones.
+
+    Returns the list of donation ids this call rejected.
+    """
+    return _settle(donation_ids, approve=False)
+
+
+def approve_donation(donation_id):
+    return bool(approve_donations([donation_id]))
+
+
+def reject_donation(donation_id):
+    return bool(reject_donations([donation_id]))
+
+
+def _chunks(items):
+    for start in range(0, len(items), CHUNK_SIZE):
+        yield items[start:start + CHUNK_SIZE]
+
+
+def _settle(donation_ids, approve):
+    donation_ids = list(donation_ids)
+    for _ in range(MAX_RETRIES):
+        # Read before the transaction so that its first statement is a write:
+        # on SQLite a transaction that reads first and then upgrades to a write
+        # lock fails with "database is locked" instead of waiting its turn.
+        rows = []
+        for chunk in _chunks(donation_ids):
+            candidates = Donation.objects.filter(pk__in=chunk)
+            if approve:
+                candidates = candidates.filter(is_approved=False)
+            else:
+                candidates = candidates.filter(is_rejected=False)
+            rows += candidates.values(
+                'id', 'user_id', 'is_approved', 'is_rejected', 'name', 'email', 'campaign__title', *rollups.DONATION_FIELDS
+            )
+        if not rows:
+            return []
+        try:
+            with transaction.atomic():
+                _flip(rows, approve)
+                ledger.record(_entries(rows, approve))
+                counters.settled(rows, approve)
+                if approve:
+                    rollups.apply(rows, 1)
+                else:
+                    rollups.apply([r for r in rows if r['is_approved']], -1)
+                outbox.queue_many(_mails(rows, approve))
+                if approve or any(r['is_approved'] for r in rows):
+                    transaction.on_commit(caching.invalidate_approved)
+                users = {r['user_id'] for r in rows}
+                transaction.on_commit(lambda: caching.invalidate_user_donations(users))
+            return [row['id'] for row in rows]
+        except _Conflict:
+            continue
+    raise RuntimeError("Gave up settling donations after repeated concurrent updates.")
+
+
+def _flip(rows, approve):
+    """Change status only where it still matches what was read.
+
+    If fewer rows change than were read, another transaction settled some of
+    them in between and the whole batch is retried.
+    """
+    if approve:
+        groups = [({'is_approved': False}, [r['id'] for r in rows])]
+        new_status = {'is_approved': True, 'is_rejected': False}
+    else:
+        # Approved rows need a reversing ledger entry, so they must not have
+        # changed state since the read either.
+        groups = [
+            ({'is_approved': True}, [r['id'] for r in rows if r['is_approved']]),
+            ({'is_approved': False, 'is_rejected': False}, [r['id'] for r in rows if not r['is_approved']]),
+        ]
+        new_status = {'is_approved': False, 'is_rejected': True}
+    for expected, ids in groups:
+        for chunk in _chunks(ids):
+            changed = Donation.objects.filter(pk__in=chunk, **expected).update(**new_status)
+            if changed != len(chunk):
+                raise _Conflict
+
+
+def _entries(rows, approve):
+    for r in rows:
+        if r['amount'] and approve:
+            yield r['campaign_id'], r['id'], Decimal(r['amount'])
+        elif r['amount'] and r['is_approved']:
+            yield r['campaign_id'], r['id'], -Decimal(r['amount'])
+
+
+def _mails(rows, approve):
+    subject, body = (APPROVED_SUBJECT, APPROVED_BODY) if approve else (REJECTED_SUBJECT, REJECTED_BODY)
+    for r in rows:
+        yield subject, body.format(name=r['name'], title=r['campaign__title']), settings.EMAIL_HOST_USER, [r['email']]
@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class DonationsappConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'DonationsApp'
+
+    def ready(self):
+        from . import signals  # noqa: F401  (connects the cache invalidation receivers)
@@ -0,0 +1,86 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import counters, ledger
+from .models import ArchivedDonation, Donation
+
+# Settled donations older than this leave the hot table
+ARCHIVE_AFTER_DAYS = 365
+BATCH_SIZE = 500  # stays under SQLite's bound-parameter limit
+
+SETTLED = Q(is_approved=True) | Q(is_rejected=True)
+
+
+def archive_after_days():
+    return getattr(settings, 'DONATION_ARCHIVE_AFTER_DAYS', ARCHIVE_AFTER_DAYS)
+
+
+def querysets(**filters):
+    """The hot and archived donations matching filters, for reads that span both.
+
+    Pending donations are always hot. Feed the pair to
+    pagination.paginate_across() or merge them on (donated_at, id).
+    """
+    return [Donation.objects.filter(**filters), ArchivedDonation.objects.filter(**filters)]
+
+
+def candidates(cutoff, batch_size=BATCH_SIZE, skip=()):
+    return list(
+        Donation.objects.filter(SETTLED, donated_at__lt=cutoff).exclude(pk__in=skip)
+        .order_by('donated_at', 'pk').values_list('pk', flat=True)[:batch_size]
+    )
+
+
+def _move(ids, archived_at):
+    """Copy the still-settled rows among ids to the archive and delete them. Returns the count."""
+    qn = connection.ops.quote_name
+    columns = ', '.join(
+        qn(f.column) for f in ArchivedDonation._meta.concrete_fields if f.name != 'archived_at'
+    )
+    placeholders = ', '.join(['%s'] * len(ids))
+    with transaction.atomic():
+        if connection.features.has_select_for_update:
+            # Keep approvals from flipping a row between the copy and the delete.
+            # SQLite needs no lock: the INSERT below takes its single write lock.
+            list(Donation.objects.select_for_update().filter(pk__in=ids).values_list('pk'))
+        with connection.cursor() as cursor:
+            # Copied in the database, with the status as of this transaction
+            cursor.execute(
+                f"INSERT INTO {qn(ArchivedDonation._meta.db_table)} ({columns}, {qn('archived_at')}) "
+                f"SELECT {columns}, %s FROM {qn(Donation._meta.db_table)} "
+                f"WHERE {qn('id')} IN ({placeholders}) AND ({qn('is_approved')} OR {qn('is_rejected')})",
+                [connection.ops.adapt_datetimefield_value(archived_at), *ids],
+            )
+            moved = cursor.rowcount
+        with counters.archiving():
+            Donation.objects.filter(pk__in=ArchivedDonation.objects.filter(pk__in=ids).values('pk')).delete()
+    return moved
+
+
+def archive(days=None, batch_size=BATCH_SIZE, limit=None):
+    """Move approved and rejected donations older than the horizon to ArchivedDonation.
+
+    Works oldest first in batches of batch_size, each in its own transaction,
+    so the hot table stays writable throughout. Ledger rows are left in
+    place, so Campaign.collected_amount and ledger.rebuild_totals() are
+    unaffected. Returns the number of donations moved.
+    """
+    cutoff = timezone.now() - timedelta(days=archive_after_days() if days is None else days)
+    # backfill only looks at the hot table, so donations that predate the
+    # ledger get their rows before they leave it
+    ledger.backfill_contributions()
+    moved, skipped = 0, set()
+    while limit is None or moved < limit:
+        ids = candidates(cutoff, batch_size if limit is None else min(batch_size, limit - moved), skipped)
+        if not ids:
+            break
+        batch = _move(ids, timezone.now())
+        if batch < len(ids):
+            # Rows that changed under the move stay for the next run; carry on past them
+            skipped.update(Donation.objects.filter(pk__in=ids).values_list('pk', flat=True))
+        moved += batch
+    return moved
@@ -0,0 +1,43 @@
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.views import redirect_to_login
+
+
+def _resolve_user(request):
+    request.user.is_authenticated  # evaluates the lazy user (session + user lookups)
+    return request.user
+
+
+async def aget_user(request):
+    """request.user for async views, loaded off the event loop.
+
+    Django 4.2 has no request.auser(); touching request.user directly from a
+    coroutine would run its queries on the loop and raise
+    SynchronousOnlyOperation. Once resolved it is cached on the request, so
+    templates can use it freely.
+    """
+    return await sync_to_async(_resolve_user)(request)
+
+
+def login_required(view_func):
+    """Async counterpart of django.contrib.auth.decorators.login_required."""
+    @wraps(view_func)
+    async def wrapper(request, *args, **kwargs):
+        user = await aget_user(request)
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path(), settings.LOGIN_URL)
+        return await view_func(request, *args, **kwargs)
+    return wrapper
+
+
+def staff_member_required(view_func):
+    """Async counterpart of django.contrib.admin.views.decorators.staff_member_required."""
+    @wraps(view_func)
+    async def wrapper(request, *args, **kwargs):
+        user = await aget_user(request)
+        if not (user.is_active and user.is_staff):
+            return redirect_to_login(request.get_full_path(), 'admin:login')
+        return await view_func(request, *args, **kwargs)
+    return wrapper
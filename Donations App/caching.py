@@ -0,0 +1,113 @@
+import time
+
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from .models import Campaign, Organization
+
+CATEGORY_TIMEOUT = 60 * 60  # signals invalidate on change; this is only a safety net
+CATEGORIES = dict(Campaign.CATEGORY_CHOICES)
+
+ORGANIZATIONS_TIMEOUT = 60 * 60 * 24
+ORGANIZATIONS_VERSION_KEY = 'organizations:version'
+APPROVED_VERSION_KEY = 'donations:approved:version'
+
+
+def user_donations_key(user_id):
+    return f"donations:user:{user_id}:version"
+
+
+def category_key(category, is_staff):
+    # Staff get Edit/Delete buttons on each card, so they get their own copy
+    return f"campaigns:{category}:{'staff' if is_staff else 'public'}"
+
+
+def category_version_key(category):
+    return f"campaigns:{category}:version"
+
+
+def category_version(category):
+    """Version stamp of a category page, bumped whenever its campaigns change."""
+    if category not in CATEGORIES:
+        return None
+    return cache.get_or_set(category_version_key(category), time.time_ns, None)
+
+
+def campaigns_version(category=None):
+    """Version stamp of the campaigns in category, or of all campaigns."""
+    if category is not None:
+        return category_version(category)
+    return max(category_version(c) for c in CATEGORIES)
+
+
+def campaign_list_html(category, user):
+    """Rendered campaign cards for a category, served from cache when warm."""
+    key = category_key(category, user.is_staff)
+    html = cache.get(key)
+    if html is None:
+        campaigns = Campaign.objects.filter(category=category)
+        html = render_to_string('campaign_list.html', {'campaigns': campaigns, 'user': user})
+        cache.set(key, str(html), CATEGORY_TIMEOUT)
+    return mark_safe(html)
+
+
+async def acampaign_list_html(category, user):
+    """campaign_list_html() for async views. user must already be resolved."""
+    key = category_key(category, user.is_staff)
+    html = await cache.aget(key)
+    if html is None:
+        campaigns = [c async for c in Campaign.objects.filter(category=category)]
+        html = render_to_string('campaign_list.html', {'campaigns': campaigns, 'user': user})
+        await cache.aset(key, str(html), CATEGORY_TIMEOUT)
+    return mark_safe(html)
+
+
+def invalidate_categories(categories=None):
+    categories = CATEGORIES if categories is None else categories
+    cache.delete_many([category_key(c, staff) for c in categories for staff in (False, True)])
+    stamp = time.time_ns()
+    cache.set_many({category_version_key(c): stamp for c in categories}, None)
+
+
+def organizations_version():
+    """Current version stamp of the Organization directory.
+
+    Every cached copy of the directory (the list and the per-role rendered
+    cards) is keyed by this stamp, so bumping it invalidates all of them at
+    once. It is seeded from the clock rather than 1 so that an evicted stamp
+    can never bring an old version back to life.
+    """
+    return cache.get_or_set(ORGANIZATIONS_VERSION_KEY, time.time_ns, None)
+
+
+def organizations():
+    key = f"organizations:list:{organizations_version()}"
+    orgs = cache.get(key)
+    if orgs is None:
+        orgs = list(Organization.objects.all())
+        cache.set(key, orgs, ORGANIZATIONS_TIMEOUT)
+    return orgs
+
+
+def invalidate_organizations():
+    cache.set(ORGANIZATIONS_VERSION_KEY, time.time_ns(), None)
+
+
+def approved_version():
+    """Version stamp of the approved-donations listing."""
+    return cache.get_or_set(APPROVED_VERSION_KEY, time.time_ns, None)
+
+
+def invalidate_approved():
+    cache.set(APPROVED_VERSION_KEY, time.time_ns(), None)
+
+
+def user_donations_version(user):
+    """Version stamp of one user's own donations, whatever their status."""
+    return cache.get_or_set(user_donations_key(user.pk), time.time_ns, None)
+
+
+def invalidate_user_donations(user_ids):
+    stamp = time.time_ns()
+    cache.set_many({user_donations_key(user_id): stamp for user_id in user_ids if user_id is not None}, None)
@@ -0,0 +1,69 @@
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+
+def validators(stamp, user, per_user=False):
+    """(ETag, Last-Modified timestamp) for a page at version stamp.
+
+    Staff and other users see different navigation, so they get different
+    ETags for the same stamp; a per_user page is tied to the user's id, so
+    a copy cached under another login never validates. Stamps are
+    time.time_ns() values, which makes them usable as modification times
+    as well.
+    """
+    tag = user.pk if per_user else ('s' if user.is_staff else 'u')
+    return f'"{stamp:x}-{tag}"', stamp // 10**9
+
+
+def _check(request, version, per_user, args, kwargs):
+    """(ETag, Last-Modified, 304 response or None) for a request."""
+    if request.method not in ('GET', 'HEAD'):
+        return None, None, None
+    stamp = version(request.user, *args, **kwargs) if per_user else version(*args, **kwargs)
+    if stamp is None:
+        return None, None, None
+    etag, last_modified = validators(stamp, request.user, per_user)
+    return etag, last_modified, get_conditional_response(request, etag=etag, last_modified=last_modified)
+
+
+def _finish(response, etag, last_modified):
+    if etag and response.status_code in (200, 304):
+        response.headers.setdefault('ETag', etag)
+        response.headers.setdefault('Last-Modified', http_date(last_modified))
+        # Pages are per role and revalidated on every view
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def conditional(version, per_user=False):
+    """Answer If-None-Match/If-Modified-Since from a version stamp alone.
+
+    version(*view_args, **view_kwargs) returns the page's current stamp (see
+    caching.category_version), or None to skip the check. With per_user the
+    page belongs to request.user and version(user, *view_args, ...) is
+    called instead (see caching.user_donations_version). When the client's
+    copy is current the view is never called, so a 304 runs no listing
+    queries and renders no template.
+    Goes inside the login decorators, which resolve request.user. Works on
+    sync and async views; the stamp lookups only read the cache.
+    """
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def wrapper(request, *args, **kwargs):
+                etag, last_modified, response = _check(request, version, per_user, args, kwargs)
+                if response is None:
+                    response = await view_func(request, *args, **kwargs)
+                return _finish(response, etag, last_modified)
+        else:
+            @wraps(view_func)
+            def wrapper(request, *args, **kwargs):
+                etag, last_modified, response = _check(request, version, per_user, args, kwargs)
+                if response is None:
+                    response = view_func(request, *args, **kwargs)
+                return _finish(response, etag, last_modified)
+        return wrapper
+    return decorator
@@ -0,0 +1,157 @@
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.db import connection, transaction
+from django.db.models import Count, IntegerField, Max, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from . import caching, signals
+from .models import ArchivedDonation, Campaign, Donation
+
+CHUNK_SIZE = 500  # campaigns per reconcile statement
+
+APPROVED = Q(is_approved=True)
+PENDING = Q(is_approved=False, is_rejected=False)
+
+_local = threading.local()
+
+
+def _deltas():
+    return defaultdict(lambda: [0, 0, None])  # donors, pending, newest approved donated_at
+
+
+def _newer(current, donated_at):
+    return donated_at if current is None or donated_at > current else current
+
+
+def apply(deltas, categories=None):
+    """Add {campaign_id: [donors, pending, newest approved donated_at]} to the campaigns.
+
+    Relative single-statement updates, as ledger.record() does for
+    collected_amount, so concurrent requests never lose a count;
+    last_donation_at only ever moves forward here. Run it inside the
+    transaction that changed the donations. categories, when the caller
+    already has them, saves looking them up to invalidate the listings.
+    """
+    deltas = {campaign_id: delta for campaign_id, delta in deltas.items() if any(delta)}
+    if not deltas:
+        return
+    qn = connection.ops.quote_name
+    last = qn('last_donation_at')
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"UPDATE {qn(Campaign._meta.db_table)} SET "
+            f"{qn('donor_count')} = {qn('donor_count')} + %s, {qn('pending_count')} = {qn('pending_count')} + %s, "
+            f"{last} = CASE WHEN {last} IS NULL OR {last} < %s THEN %s ELSE {last} END "
+            f"WHERE {qn('id')} = %s",
+            [
+                (donors, pending, *[connection.ops.adapt_datetimefield_value(newest)] * 2, campaign_id)
+                for campaign_id, (donors, pending, newest) in deltas.items()
+            ],
+        )
+    signals.campaign_totals_changed.send(sender=Campaign, campaign_ids=list(deltas), categories=categories)
+
+
+def created(donations):
+    """Count donations that were just inserted, whatever their status."""
+    deltas = _deltas()
+    for d in donations:
+        delta = deltas[d.campaign_id]
+        if d.is_approved:
+            delta[0] += 1
+            delta[2] = _newer(delta[2], d.donated_at)
+        elif not d.is_rejected:
+            delta[1] += 1
+    apply(deltas, {d.campaign.category for d in donations})
+
+
+def settled(rows, approve):
+    """Move donations that approvals._settle() just flipped between the counters.
+
+    rows carry campaign_id, is_approved, is_rejected and donated_at as they
+    were before the flip.
+    """
+    deltas, reversed_ = _deltas(), set()
+    for r in rows:
+        delta = deltas[r['campaign_id']]
+        pending = not r['is_approved'] and not r['is_rejected']
+        if approve:
+            delta[0] += 1
+            delta[1] -= pending
+            delta[2] = _newer(delta[2], r['donated_at'])
+        elif r['is_approved']:
+            delta[0] -= 1
+            reversed_.add(r['campaign_id'])
+        else:
+            delta[1] -= 1
+    apply(deltas, {r['campaign__category'] for r in rows})
+    if reversed_:
+        # A reversal may have taken away the newest approved donation
+        Campaign.objects.filter(pk__in=reversed_).update(last_donation_at=_newest_approved())
+
+
+@contextmanager
+def archiving():
+    """Mark deletes on this thread as moves to ArchivedDonation, which keep the counters."""
+    _local.archiving = True
+    try:
+        yield
+    finally:
+        _local.archiving = False
+
+
+def deleted(donation):
+    """Take a donation that was just deleted out of the counters, unless it was archived."""
+    if getattr(_local, 'archiving', False) or donation.is_rejected:
+        return
+    deltas = _deltas()
+    deltas[donation.campaign_id][0 if donation.is_approved else 1] -= 1
+    apply(deltas)
+    if donation.is_approved:
+        # It may have been the newest approved donation
+        Campaign.objects.filter(pk=donation.campaign_id).update(last_donation_at=_newest_approved())
+
+
+def _per_campaign(model, condition, aggregate):
+    return Subquery(
+        model.objects.filter(condition, campaign=OuterRef('pk'))
+        .order_by().values('campaign').annotate(value=aggregate).values('value')
+    )
+
+
+def _count(model, condition):
+    return Coalesce(_per_campaign(model, condition, Count('pk')), Value(0), output_field=IntegerField())
+
+
+def _newest_approved():
+    hot = _per_campaign(Donation, APPROVED, Max('donated_at'))
+    archived = _per_campaign(ArchivedDonation, APPROVED, Max('donated_at'))
+    # Either side may be NULL, and GREATEST/MAX() with a NULL is NULL on some backends
+    return Greatest(Coalesce(hot, archived), Coalesce(archived, hot))
+
+
+def reconcile(chunk_size=CHUNK_SIZE):
+    """Recompute every campaign's counters from the hot and archived donations.
+
+    Works through the campaigns in id order, chunk_size per UPDATE, each in
+    its own transaction, so the table stays writable throughout. Fixes drift
+    from anything that bypasses counters.py, such as editing a donation's
+    status in the admin form. Returns the number of campaigns.
+    """
+    done, last_id = 0, 0
+    while True:
+        ids = list(
+            Campaign.objects.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:chunk_size]
+        )
+        if not ids:
+            transaction.on_commit(caching.invalidate_categories)
+            return done
+        with transaction.atomic():
+            Campaign.objects.filter(pk__in=ids).update(
+                donor_count=_count(Donation, APPROVED) + _count(ArchivedDonation, APPROVED),
+                pending_count=_count(Donation, PENDING),
+                last_donation_at=_newest_approved(),
+            )
+        done += len(ids)
+        last_id = ids[-1]
@@ -0,0 +1,136 @@
+import hashlib
+import os
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, StopUpload
+from django.core.validators import FileExtensionValidator
+from django.http import FileResponse, HttpResponse
+from django.utils.deconstruct import deconstructible
+
+DOCUMENT_DIR = 'documents/'
+# Recipient verification scans; anything bigger is cut off before it is read
+MAX_UPLOAD_SIZE = 10 * 1024 * 1024
+# Room for the other form fields and the multipart framing
+FORM_OVERHEAD = 256 * 1024
+FILES_PER_REQUEST = 2
+# Scans are shown in the browser only as one of these types; anything else
+# (HTML, SVG, ...) would run as a page on our origin
+INLINE_TYPES = {'pdf': 'application/pdf', 'jpg': 'image/jpeg', 'jpeg': 'image/jpeg', 'png': 'image/png'}
+validate_extension = FileExtensionValidator(list(INLINE_TYPES))
+
+
+def max_upload_size():
+    return getattr(settings, 'DOCUMENT_MAX_UPLOAD_SIZE', MAX_UPLOAD_SIZE)
+
+
+def content_name(digest, filename):
+    """Sharded storage name for a file: documents/ab/cd/abcd...<ext>."""
+    ext = os.path.splitext(filename)[1].lower()[:10]
+    return f"{DOCUMENT_DIR}{digest[:2]}/{digest[2:4]}/{digest}{ext}"
+
+
+class HashedUpload(TemporaryUploadedFile):
+    """An upload already on disk, with the SHA-256 of its bytes."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.hasher = hashlib.sha256()
+
+    @property
+    def sha256(self):
+        return self.hasher.hexdigest()
+
+
+class DocumentUploadHandler(FileUploadHandler):
+    """Stream uploaded files to temp files in chunks, hashing as they arrive.
+
+    Nothing is held in memory beyond one chunk. A request whose declared
+    Content-Length is over the limit, or a file that grows past it, stops the
+    upload there and sets request.upload_too_large; the rest of the body is
+    never read.
+    """
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        self.request_too_large = content_length > FILES_PER_REQUEST * max_upload_size() + FORM_OVERHEAD
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        if self.request_too_large:
+            self.stop()
+        self.file = HashedUpload(self.file_name, self.content_type, 0, self.charset, self.content_type_extra)
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > max_upload_size():
+            self.file.close()
+            self.stop()
+        self.file.hasher.update(raw_data)
+        self.file.write(raw_data)
+
+    def file_complete(self, file_size):
+        self.file.seek(0)
+        self.file.size = file_size
+        return self.file
+
+    def stop(self):
+        self.request.upload_too_large = True
+        raise StopUpload(connection_reset=True)
+
+
+@deconstructible
+class DocumentStorage(FileSystemStorage):
+    """Content-addressed storage: a file is stored once, named by its SHA-256.
+
+    The name a field asks for only contributes its extension. Saving bytes
+    that are already stored returns the existing name, so a resubmitted scan
+    costs nothing. HashedUpload temp files are moved into place, not copied.
+    """
+
+    def save(self, name, content, max_length=None):
+        digest = getattr(content, 'sha256', None)
+        if digest is None:
+            hasher = hashlib.sha256()
+            for chunk in content.chunks():
+                hasher.update(chunk)
+            digest = hasher.hexdigest()
+            content.seek(0)
+        name = content_name(digest, name or getattr(content, 'name', '') or '')
+        if self.exists(name):
+            return name
+        saved = self._save(name, content)
+        if saved != name:
+            # Same bytes stored concurrently under our name: drop the copy
+            self.delete(saved)
+        return name
+
+
+storage = DocumentStorage()
+
+
+def serve(field_file):
+    """Response for a stored document.
+
+    With DOCUMENT_SENDFILE_HEADER set ('X-Accel-Redirect' for nginx,
+    'X-Sendfile' for Apache/lighttpd) only a header is sent and the web server
+    streams the file. Otherwise Django streams it itself, which is fine for
+    development. Only the INLINE_TYPES open in the browser; any other file
+    (stored before uploads were restricted) is sent as a download.
+    """
+    ext = os.path.splitext(field_file.name)[1].lower().lstrip('.')
+    content_type = INLINE_TYPES.get(ext, 'application/octet-stream')
+    disposition = 'inline' if ext in INLINE_TYPES else 'attachment'
+    header = getattr(settings, 'DOCUMENT_SENDFILE_HEADER', None)
+    if header:
+        response = HttpResponse(content_type=content_type)
+        if header == 'X-Accel-Redirect':
+            response[header] = getattr(settings, 'DOCUMENT_SENDFILE_PREFIX', '/protected/') + field_file.name
+        else:
+            response[header] = field_file.path
+    else:
+        response = FileResponse(field_file.open('rb'), content_type=content_type)
+    response['Content-Disposition'] = f'{disposition}; filename="{os.path.basename(field_file.name)}"'
+    response['X-Content-Type-Options'] = 'nosniff'
+    # The name is the content hash, so the bytes behind a URL never change
+    response['Cache-Control'] = 'private, max-age=31536000, immutable'
+    return response
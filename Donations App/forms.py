@@ -36,14 +36,48 @@ class CampaignForm(forms.ModelForm):
 #         model = Donation
 #         fields = ['campaign', 'amount']
 
+class CampaignPickerField(forms.ModelChoiceField):
+    """A campaign posted by id from a hidden input, instead of a <select> listing every campaign.
+
+    The page fills it from the URL's campaign, or from the campaign_suggest
+    search box when the donor picks another one.
+    """
+    widget = forms.HiddenInput
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.known = None
+
+    def to_python(self, value):
+        # The view has already loaded the URL's campaign; don't fetch it again
+        if self.known is not None and str(value) == str(self.known.pk):
+            return self.known
+        return super().to_python(value)
+
+
 class DonationForm(forms.ModelForm):
     class Meta:
         model = Donation
         fields = ['donation_type', 'name', 'phone', 'email', 'campaign', 'purpose', 'amount', 'address']
+        field_classes = {
+            'campaign': CampaignPickerField,
+        }
         widgets = {
             'donation_type': forms.RadioSelect()
         }
 
+    def __init__(self, *args, campaign=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['campaign'].known = campaign
+
+    def _get_validation_exclusions(self):
+        exclude = super()._get_validation_exclusions()
+        # The campaign field only cleans to a row that exists, so the model's
+        # own foreign key check would just repeat that lookup
+        if self.cleaned_data.get('campaign') is not None:
+            exclude.add('campaign')
+        return exclude
+
 class ContactForm(forms.ModelForm):
     class Meta:
         model = ContactQuery
@@ -61,3 +95,7 @@ class RecipientRequestForm(forms.ModelForm):
     class Meta:
         model = RecipientRequest
         fields = ['aadhaar_number', 'ration_card_number', 'aadhaar_file', 'ration_card_file', 'family_income', 'description']
+
+class DonationImportForm(forms.Form):
+    file = forms.FileField(help_text="CSV or XLSX with a header row.")
+    dry_run = forms.BooleanField(required=False, label="Only validate, don't import")
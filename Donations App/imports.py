@@ -0,0 +1,195 @@
+import csv
+import io
+import os
+from datetime import date, datetime, time
+
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from . import caching, counters, ledger, rollups
+from .forms import DonationForm
+from .models import Campaign, Donation
+
+BATCH_SIZE = 500  # stays under SQLite's bound-parameter limit
+MAX_ERRORS = 1000  # kept on the report; further failures are only counted
+FORMATS = ('.csv', '.xlsx')
+# DonationForm's fields, plus the day the donation was collected
+COLUMNS = DonationForm._meta.fields + ['donated_at']
+
+
+class ImportReport:
+    def __init__(self):
+        self.imported = 0
+        self.failed = 0
+        self.errors = []  # (line, message), at most MAX_ERRORS
+
+    def add_error(self, line, message):
+        self.failed += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append((line, message))
+
+
+class RowForm(DonationForm):
+    """DonationForm rebound to one sheet row after another.
+
+    Building a form deep-copies its fields, which costs as much as
+    validating a row, so an import validates every row of a batch with one
+    instance.
+    """
+
+    def bind(self, data, campaign):
+        self.data = data
+        self.is_bound = True
+        self.instance = Donation()
+        self.fields['campaign'].known = campaign
+        self._errors = None
+        self._bound_fields_cache = {}
+        return self
+
+
+def _header(cells):
+    return [str(c or '').strip().lower().replace(' ', '_') for c in cells]
+
+
+def _cell(value):
+    # Spreadsheets hand back 5.0 for a campaign id typed as 5
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return '' if value is None else value
+
+
+def read_csv(file):
+    """Yield (line number, row dict) from a binary CSV file with a header row."""
+    reader = csv.reader(io.TextIOWrapper(file, encoding='utf-8-sig', newline=''))
+    header = _header(next(reader, []))
+    for cells in reader:
+        if any(cells):
+            yield reader.line_num, dict(zip(header, cells))
+
+
+def read_xlsx(file):
+    """Yield (row number, row dict) from the first sheet of an XLSX file.
+
+    Uses openpyxl's read-only mode, which streams rows instead of loading the
+    whole workbook.
+    """
+    try:
+        import openpyxl
+    except ImportError:
+        raise ValueError("Reading .xlsx files needs openpyxl (pip install openpyxl); or save the sheet as CSV.")
+    workbook = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = _header(next(rows, []))
+        for number, cells in enumerate(rows, start=2):
+            if any(c not in (None, '') for c in cells):
+                yield number, {key: _cell(value) for key, value in zip(header, cells)}
+    finally:
+        workbook.close()
+
+
+def read_rows(file, filename):
+    ext = os.path.splitext(filename)[1].lower()
+    if ext == '.csv':
+        return read_csv(file)
+    if ext == '.xlsx':
+        return read_xlsx(file)
+    raise ValueError(f"Unsupported file type {ext or '(none)'}; use {' or '.join(FORMATS)}.")
+
+
+def _donated_at(value):
+    """Aware start of the day in value, or None. Raises ValueError on a bad date."""
+    if value in (None, ''):
+        return None
+    if isinstance(value, datetime):
+        value = value.date()
+    elif not isinstance(value, date):
+        value = parse_date(str(value).strip())
+        if value is None:
+            raise ValueError
+    return datetime.combine(value, time.min, tzinfo=timezone.get_current_timezone())
+
+
+def _campaign_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _import_batch(batch, report, dry_run):
+    campaigns = Campaign.objects.in_bulk({_campaign_id(row.get('campaign')) for _, row in batch} - {None})
+    valid = []
+    form = RowForm()
+    for line, row in batch:
+        # Bound to its campaign up front, so validating a row runs no query
+        form.bind(row, campaigns.get(_campaign_id(row.get('campaign'))))
+        try:
+            donated_at = _donated_at(row.get('donated_at'))
+        except ValueError:
+            form.is_valid()
+            form.add_error(None, "donated_at: enter a date as YYYY-MM-DD.")
+        if not form.is_valid():
+            report.add_error(line, '; '.join(
+                f"{field}: {' '.join(messages)}" if field != '__all__' else ' '.join(messages)
+                for field, messages in form.errors.items()
+            ))
+            continue
+        donation = form.save(commit=False)
+        # Offline donations are recorded once they are in hand
+        donation.is_approved = True
+        valid.append((donation, donated_at))
+
+    report.imported += len(valid)
+    if dry_run or not valid:
+        return
+
+    donations = [donation for donation, _ in valid]
+    with transaction.atomic():
+        Donation.objects.bulk_create(donations)
+        # bulk_create stamps auto_now_add fields with now; put the collection days back
+        dated = []
+        for donation, donated_at in valid:
+            if donated_at is not None:
+                donation.donated_at = donated_at
+                dated.append((connection.ops.adapt_datetimefield_value(donated_at), donation.pk))
+        if dated:
+            qn = connection.ops.quote_name
+            with connection.cursor() as cursor:
+                cursor.executemany(
+                    f"UPDATE {qn(Donation._meta.db_table)} SET {qn('donated_at')} = %s WHERE {qn('id')} = %s", dated,
+                )
+        # One increment per campaign for the whole batch
+        ledger.record((d.campaign_id, d.pk, d.amount or 0) for d in donations)
+        counters.created(donations)
+        rollups.apply([
+            {
+                'campaign_id': d.campaign_id, 'campaign__category': d.campaign.category,
+                'donated_at': d.donated_at, 'donation_type': d.donation_type, 'amount': d.amount,
+            }
+            for d in donations
+        ], 1)
+        transaction.on_commit(caching.invalidate_approved)
+
+
+def import_donations(rows, batch_size=BATCH_SIZE, dry_run=False):
+    """Validate and insert (line, row dict) pairs as approved donations.
+
+    Rows are checked with DonationForm, so the same fields are required as
+    on the donate page; donated_at (YYYY-MM-DD) is optional and defaults to
+    now. Valid rows go in with one bulk_create per batch, each batch in its
+    own transaction with its ledger credit and rollups, so campaign totals
+    move once per batch. Invalid rows are reported by line and skipped. With
+    dry_run nothing is written. Only one batch is held in memory at a time.
+    """
+    report = ImportReport()
+    batch = []
+    for line, row in rows:
+        batch.append((line, row))
+        if len(batch) >= batch_size:
+            _import_batch(batch, report, dry_run)
+            batch = []
+    if batch:
+        _import_batch(batch, report, dry_run)
+    return report
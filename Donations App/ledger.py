@@ -0,0 +1,78 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import DecimalField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from . import caching
+from .models import Campaign, CampaignContribution, Donation
+from .signals import campaign_totals_changed
+
+
+def record(entries):
+    """Append ledger rows and apply one increment per affected campaign.
+
+    entries is an iterable of (campaign_id, donation_id, amount); amounts are
+    negative for reversals. Must run inside the caller's transaction so the
+    ledger and the totals move together.
+    """
+    rows = [
+        CampaignContribution(campaign_id=campaign_id, donation_id=donation_id, amount=amount)
+        for campaign_id, donation_id, amount in entries
+        if amount
+    ]
+    if not rows:
+        return {}
+    CampaignContribution.objects.bulk_create(rows, batch_size=500)
+
+    totals = defaultdict(Decimal)
+    for row in rows:
+        totals[row.campaign_id] += row.amount
+    qn = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        # Relative increments, no read-modify-write of the campaign rows; one
+        # statement prepared once for all of them
+        cursor.executemany(
+            f"UPDATE {qn(Campaign._meta.db_table)} SET {qn('collected_amount')} = {qn('collected_amount')} + %s "
+            f"WHERE {qn('id')} = %s",
+            [(amount, campaign_id) for campaign_id, amount in totals.items()],
+        )
+    campaign_totals_changed.send(sender=Campaign, campaign_ids=list(totals))
+    return dict(totals)
+
+
+def backfill_contributions():
+    """Create ledger rows for approved donations that predate the ledger."""
+    missing = (
+        Donation.objects.filter(is_approved=True, amount__gt=0, contributions__isnull=True)
+        .only('id', 'campaign_id', 'amount')
+    )
+    rows = [
+        CampaignContribution(campaign_id=d.campaign_id, donation_id=d.id, amount=d.amount)
+        for d in missing.iterator()
+    ]
+    CampaignContribution.objects.bulk_create(rows, batch_size=500)
+    return len(rows)
+
+
+def rebuild_totals(campaign_ids=None):
+    """Recompute Campaign.collected_amount from the ledger."""
+    total = (
+        CampaignContribution.objects.filter(campaign=OuterRef('pk'))
+        .values('campaign')
+        .annotate(total=Sum('amount'))
+        .values('total')
+    )
+    campaigns = Campaign.objects.all()
+    if campaign_ids is not None:
+        campaigns = campaigns.filter(pk__in=campaign_ids)
+    updated = campaigns.update(
+        collected_amount=Coalesce(
+            Subquery(total),
+            Value(Decimal('0')),
+            output_field=DecimalField(max_digits=10, decimal_places=2),
+        )
+    )
+    transaction.on_commit(caching.invalidate_categories)
+    return updated
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from DonationsApp import archive
+from DonationsApp.models import ArchivedDonation, Donation
+
+
+class Command(BaseCommand):
+    help = (
+        "Move approved and rejected donations older than DONATION_ARCHIVE_AFTER_DAYS "
+        "into the archive table, in batched transactions."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help="Archive settled donations older than this (default from settings).")
+        parser.add_argument('--batch-size', type=int, default=archive.BATCH_SIZE)
+        parser.add_argument('--limit', type=int, help="Stop after moving this many donations.")
+
+    def handle(self, *args, **options):
+        moved = archive.archive(options['days'], options['batch_size'], options['limit'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {moved} donations; {Donation.objects.count()} hot, "
+            f"{ArchivedDonation.objects.count()} archived."
+        ))
@@ -0,0 +1,76 @@
+import json
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, transaction
+
+from DonationsApp.models import Campaign, Donation
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure concurrent donation-insert throughput on the configured database. "
+        "Run once per DJANGO_DB_PROFILE to compare profiles. Rows are removed afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--writes', type=int, default=200, help="Inserts per thread.")
+        parser.add_argument('--baseline', action='store_true',
+                            help="SQLite only: use stock settings (rollback journal, full sync, 5s timeout).")
+
+    def handle(self, *args, **options):
+        if options['baseline'] and connection.vendor == 'sqlite':
+            settings.SQLITE_PRAGMAS = {'journal_mode': 'delete', 'synchronous': 'full'}
+            connection.settings_dict['OPTIONS'] = {'timeout': 5}
+            connection.close()
+
+        owner, _ = User.objects.get_or_create(username='bench-db-writes')
+        campaign = Campaign.objects.create(
+            title='DB write benchmark', description='-', goal_amount=1, created_by=owner,
+        )
+        errors = []
+        barrier = threading.Barrier(options['threads'] + 1)
+
+        def writer():
+            barrier.wait()
+            try:
+                for _ in range(options['writes']):
+                    try:
+                        with transaction.atomic():
+                            Donation.objects.create(campaign=campaign, amount=1)
+                    except OperationalError as exc:
+                        errors.append(str(exc))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=writer) for _ in range(options['threads'])]
+        for t in threads:
+            t.start()
+        barrier.wait()
+        start = time.perf_counter()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+
+        written = Donation.objects.filter(campaign=campaign).count()
+        campaign.delete()
+        owner.delete()
+
+        journal_mode = None
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                journal_mode = cursor.execute('PRAGMA journal_mode').fetchone()[0]
+        self.stdout.write(json.dumps({
+            'profile': settings.DB_PROFILE + (' (baseline)' if options['baseline'] else ''),
+            'vendor': connection.vendor,
+            'journal_mode': journal_mode,
+            'threads': options['threads'],
+            'writes': written,
+            'errors': len(errors),
+            'seconds': round(elapsed, 3),
+            'writes_per_second': round(written / elapsed, 1) if elapsed else None,
+        }, indent=2))
@@ -0,0 +1,104 @@
+import copy
+import json
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.template.loader import render_to_string
+from django.test import RequestFactory, override_settings
+
+from DonationsApp import caching
+from DonationsApp.models import Profile
+
+DASHBOARDS = {
+    'admin': 'dashboard_admin.html',
+    'donor': 'dashboard_donor.html',
+    'recipient': 'dashboard_recipient.html',
+}
+UNCACHED_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+NO_FRAGMENTS = {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+
+
+def templates_setting(cached_loader):
+    templates = copy.deepcopy(settings.TEMPLATES)
+    templates[0]['APP_DIRS'] = False
+    templates[0]['OPTIONS']['loaders'] = (
+        [('django.template.loaders.cached.Loader', UNCACHED_LOADERS)] if cached_loader else UNCACHED_LOADERS
+    )
+    return templates
+
+
+class Command(BaseCommand):
+    help = (
+        "Time rendering of the three role dashboards: re-parsing every template without fragment "
+        "caching (before), with the cached loader only, and with the cached loader plus {% cache %} "
+        "fragments (production mode)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=300)
+        parser.add_argument('--output', '-o', help="Write the JSON report to this file.")
+
+    def handle(self, *args, **options):
+        fragments_off = dict(settings.CACHES, template_fragments=NO_FRAGMENTS)
+        modes = {
+            'before': {'TEMPLATES': templates_setting(False), 'CACHES': fragments_off},
+            'cached_loader': {'TEMPLATES': templates_setting(True), 'CACHES': fragments_off},
+            'cached_loader_and_fragments': {'TEMPLATES': templates_setting(True)},
+        }
+        requests = {role: self.request(role) for role in DASHBOARDS}
+
+        report = {}
+        for mode, overrides in modes.items():
+            with override_settings(**overrides):
+                report[mode] = {
+                    template: self.time_render(template, requests[role], options['repeat'])
+                    for role, template in DASHBOARDS.items()
+                }
+
+        for template in DASHBOARDS.values():
+            before = report['before'][template]['p50_ms']
+            line = '  '.join(
+                f"{mode} {report[mode][template]['p50_ms']:.3f} ms (x{before / report[mode][template]['p50_ms']:.1f})"
+                for mode in modes
+            )
+            self.stderr.write(f"{template:26} {line}")
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output)
+        else:
+            self.stdout.write(output)
+
+    def request(self, role):
+        user, _ = User.objects.get_or_create(username=f'bench-templates-{role}', defaults={'is_staff': role == 'admin'})
+        profile, _ = Profile.objects.get_or_create(user=user, defaults={'role': role, 'phone': '0', 'address': '-'})
+        request = RequestFactory().get('/dashboard/')
+        request.user = user
+        request.profile = profile
+        return request
+
+    def time_render(self, template, request, repeat):
+        # The same context the dashboard view builds
+        context = {
+            'profile': request.profile,
+            'organizations': caching.organizations,
+            'organizations_version': caching.organizations_version(),
+            'organizations_timeout': caching.ORGANIZATIONS_TIMEOUT,
+        }
+        render_to_string(template, context, request)  # warm-up: fills the loader and fragment caches
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            render_to_string(template, context, request)
+            timings.append((time.perf_counter() - start) * 1000)
+        return {
+            'p50_ms': round(statistics.median(timings), 3),
+            'mean_ms': round(statistics.fmean(timings), 3),
+        }
@@ -0,0 +1,136 @@
+import json
+import statistics
+import time
+import tracemalloc
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, setup_test_environment
+from django.urls import URLPattern, reverse
+
+from DonationsApp import urls
+from DonationsApp.models import Campaign, ContactQuery, Donation, Profile, RecipientRequest
+
+# GET routes that change data; benchmarking them would alter the dataset
+MUTATING = {'approve_donation', 'reject_donation', 'approve_recipient_request', 'reject_recipient_request'}
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = (
+        "GET every DonationsApp URL with the test client and report latency percentiles, "
+        "query counts and peak Python memory per view as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20, help="Timed requests per view.")
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--only', nargs='*', help="URL names to run (default: all).")
+        parser.add_argument('--output', '-o', help="Write the JSON report to this file.")
+        parser.add_argument('--compare', help="Earlier JSON report to print p50 ratios against.")
+
+    def handle(self, *args, **options):
+        # Allows the 'testserver' host and swaps in the locmem mail backend
+        setup_test_environment()
+        client = Client()
+        client.force_login(self.bench_user())
+
+        results = {}
+        for name, url in self.targets(options['only']):
+            try:
+                results[name] = self.measure(client, url, options['warmup'], options['repeat'])
+            except Exception as exc:
+                # Keep going so one broken view does not hide the numbers for the rest
+                results[name] = {'url': url, 'error': f'{type(exc).__name__}: {exc}'}
+                self.stderr.write(self.style.ERROR(f"{name:28} {results[name]['error']}"))
+                continue
+            self.stderr.write(f"{name:28} p50 {results[name]['p50_ms']:8.2f} ms  {results[name]['queries']:3} queries")
+
+        report = json.dumps(results, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(report)
+        else:
+            self.stdout.write(report)
+
+        if options['compare']:
+            with open(options['compare']) as f:
+                before = json.load(f)
+            for name, now in results.items():
+                if 'p50_ms' in now and before.get(name, {}).get('p50_ms'):
+                    ratio = now['p50_ms'] / before[name]['p50_ms']
+                    self.stderr.write(f"{name:28} p50 x{ratio:.2f}  queries {before[name]['queries']} -> {now['queries']}")
+
+    def bench_user(self):
+        user, created = User.objects.get_or_create(
+            username='bench-views', defaults={'is_staff': True, 'email': 'bench@example.com'},
+        )
+        Profile.objects.get_or_create(user=user, defaults={'role': 'admin', 'phone': '0', 'address': '-'})
+        return user
+
+    def targets(self, only):
+        samples = {
+            'campaign_id': Campaign.objects.values_list('pk', flat=True).first(),
+            'donation_id': Donation.objects.values_list('pk', flat=True).first(),
+            'query_id': ContactQuery.objects.values_list('pk', flat=True).first(),
+            'request_id': RecipientRequest.objects.values_list('pk', flat=True).first(),
+            'category': 'education',
+        }
+        seen = set()
+        for pattern in urls.urlpatterns:
+            if not isinstance(pattern, URLPattern) or not pattern.name or pattern.name in MUTATING:
+                continue
+            if only and pattern.name not in only:
+                continue
+            kwargs = {key: samples.get(key) for key in pattern.pattern.converters}
+            if None in kwargs.values():
+                self.stderr.write(f"skipping {pattern.name}: no rows to fill {list(kwargs)} (run seed_data)")
+                continue
+            url = reverse(pattern.name, kwargs=kwargs)
+            if url not in seen:
+                seen.add(url)
+                yield pattern.name, url
+        if only and not seen:
+            raise CommandError("No matching URL names.")
+
+    def measure(self, client, url, warmup, repeat):
+        for _ in range(warmup):
+            self.fetch(client, url)
+
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            self.fetch(client, url)
+            timings.append((time.perf_counter() - start) * 1000)
+
+        with CaptureQueriesContext(connection) as queries:
+            tracemalloc.start()
+            status = self.fetch(client, url)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+        return {
+            'url': url,
+            'status': status,
+            'p50_ms': round(statistics.median(timings), 3),
+            'p90_ms': round(percentile(timings, 90), 3),
+            'p99_ms': round(percentile(timings, 99), 3),
+            'mean_ms': round(statistics.fmean(timings), 3),
+            'queries': len(queries),
+            'peak_kib': round(peak / 1024, 1),
+        }
+
+    @staticmethod
+    def fetch(client, url):
+        response = client.get(url)
+        if response.streaming:
+            for _ in response.streaming_content:
+                pass
+        return response.status_code
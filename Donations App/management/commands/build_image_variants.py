@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from PIL import Image
+
+from DonationsApp import caching, thumbnails
+from DonationsApp.models import Organization
+
+
+class Command(BaseCommand):
+    help = "Build resized WebP/JPEG variants for existing Organization images."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help="Rebuild even if variants look current.")
+
+    def handle(self, *args, **options):
+        built = failed = 0
+        for org in Organization.objects.exclude(image='').exclude(image__isnull=True).iterator():
+            try:
+                if thumbnails.ensure_variants(org, force=options['force']):
+                    built += 1
+            except (OSError, ValueError, Image.DecompressionBombError) as exc:
+                # Missing file on disk, not a decodable image or too many pixels
+                failed += 1
+                self.stderr.write(f"{org.pk} {org.image.name}: {exc}")
+        transaction.on_commit(caching.invalidate_organizations)
+        self.stdout.write(self.style.SUCCESS(f"Built variants for {built} organizations ({failed} failed)."))
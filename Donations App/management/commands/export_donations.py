@@ -0,0 +1,30 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from DonationsApp import exports
+
+
+class Command(BaseCommand):
+    help = "Stream donations joined to campaign and user as CSV or NDJSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=exports.FORMATS, default='csv')
+        parser.add_argument('--start', help="First day to include (YYYY-MM-DD).")
+        parser.add_argument('--end', help="Last day to include (YYYY-MM-DD).")
+        parser.add_argument('--status', choices=exports.STATUSES)
+        parser.add_argument('--output', '-o', help="File to write to (default: stdout).")
+
+    def handle(self, *args, **options):
+        try:
+            filters = exports.parse_filters(options)
+        except ValueError as exc:
+            raise CommandError(exc)
+
+        out = open(options['output'], 'w', encoding='utf-8', newline='') if options['output'] else sys.stdout
+        try:
+            for chunk in exports.stream(options['format'], exports.donation_rows(**filters)):
+                out.write(chunk)
+        finally:
+            if out is not sys.stdout:
+                out.close()
@@ -0,0 +1,40 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+
+from DonationsApp import imports
+
+
+class Command(BaseCommand):
+    help = (
+        "Import offline and in-kind donations from a CSV or XLSX file as approved donations. "
+        f"Columns: {', '.join(imports.COLUMNS)} (donated_at optional, YYYY-MM-DD)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--batch-size', type=int, default=imports.BATCH_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help="Validate every row without writing anything.")
+        parser.add_argument('--errors', help=f"Write rejected rows (first {imports.MAX_ERRORS}) to this CSV file.")
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['path'], 'rb') as f:
+                report = imports.import_donations(
+                    imports.read_rows(f, options['path']), options['batch_size'], options['dry_run'],
+                )
+        except (OSError, ValueError) as e:
+            raise CommandError(e)
+
+        for line, message in report.errors[:20]:
+            self.stderr.write(f"line {line}: {message}")
+        if report.failed > 20:
+            self.stderr.write(f"... and {report.failed - 20} more rejected rows")
+        if options['errors']:
+            with open(options['errors'], 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(['line', 'error'])
+                writer.writerows(report.errors)
+
+        verb = "Would import" if options['dry_run'] else "Imported"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {report.imported} donations; {report.failed} rows rejected."))
@@ -0,0 +1,184 @@
+import http.client
+import importlib.util
+import json
+import os
+import secrets
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from DonationsApp.models import Campaign, Donation, Profile
+
+SERVERS = {
+    'wsgi': ('gunicorn', ['DonationsProject.wsgi:application', '--workers', '{workers}', '--bind', '127.0.0.1:{port}']),
+    'asgi': ('uvicorn', ['DonationsProject.asgi:application', '--workers', '{workers}', '--port', '{port}',
+                         '--no-access-log']),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Start the app under gunicorn (WSGI) and uvicorn (ASGI) with the same worker count, "
+        "drive both with the same concurrent client load and compare requests per second. "
+        "Needs gunicorn and uvicorn installed; run against a seeded database (see seed_data)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--servers', nargs='+', choices=SERVERS, default=list(SERVERS))
+        parser.add_argument('--workers', type=int, default=2, help="Server worker processes, same for both.")
+        parser.add_argument('--concurrency', type=int, default=32, help="Client connections in flight.")
+        parser.add_argument('--duration', type=float, default=10.0, help="Seconds of load per server.")
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--donate-every', type=int, default=10,
+                            help="Every Nth request POSTs a donation (0 for read-only load).")
+        parser.add_argument('--output', '-o', help="Write the JSON report to this file.")
+
+    def handle(self, *args, **options):
+        for name in options['servers']:
+            if importlib.util.find_spec(SERVERS[name][0]) is None:
+                raise CommandError(f"{SERVERS[name][0]} is not installed; it is needed for the {name} run.")
+
+        user = self.load_user()
+        campaign = Campaign.objects.order_by('pk').first()
+        if campaign is None:
+            raise CommandError("No campaigns to donate to; run seed_data first.")
+        cookies = self.cookies(user)
+        paths = [
+            reverse('my_donations'), reverse('approved_list'), reverse('category', args=[campaign.category]),
+            reverse('all_donations'), reverse('donate', args=[campaign.pk]),
+        ]
+        body = (
+            f'donation_type=money&name=load&phone=0&email=load%40example.com&campaign={campaign.pk}'
+            f'&purpose=Load+test&amount=1&csrfmiddlewaretoken={cookies["csrftoken"]}'
+        )
+        plan = {'paths': paths, 'donate': (reverse('donate', args=[campaign.pk]), body),
+                'every': options['donate_every'], 'cookies': cookies}
+
+        report = {}
+        try:
+            for name in options['servers']:
+                server = self.start(name, options['workers'], options['port'])
+                try:
+                    report[name] = self.drive(options['port'], plan, options['concurrency'], options['duration'])
+                finally:
+                    server.terminate()
+                    server.wait(timeout=30)
+                report[name]['workers'] = options['workers']
+                self.stderr.write(
+                    f"{name}: {report[name]['requests_per_second']:8.1f} req/s  "
+                    f"p50 {report[name]['p50_ms']:.1f} ms  p99 {report[name]['p99_ms']:.1f} ms  "
+                    f"{report[name]['errors']} errors"
+                )
+        finally:
+            Donation.objects.filter(user=user).delete()
+
+        if 'wsgi' in report and 'asgi' in report and report['wsgi']['requests_per_second']:
+            ratio = report['asgi']['requests_per_second'] / report['wsgi']['requests_per_second']
+            self.stderr.write(f"asgi/wsgi throughput: x{ratio:.2f}")
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output)
+        else:
+            self.stdout.write(output)
+
+    def load_user(self):
+        user, _ = User.objects.get_or_create(
+            username='load-test', defaults={'is_staff': True, 'email': 'load@example.com'},
+        )
+        Profile.objects.get_or_create(user=user, defaults={'role': 'admin', 'phone': '0', 'address': '-'})
+        return user
+
+    def cookies(self, user):
+        # The same session Client.force_login would create, shared by every client connection
+        session = import_module(settings.SESSION_ENGINE).SessionStore()
+        session[SESSION_KEY] = user._meta.pk.value_to_string(user)
+        session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.save()
+        # An unmasked secret is accepted both as the cookie and as the form token
+        return {settings.SESSION_COOKIE_NAME: session.session_key, settings.CSRF_COOKIE_NAME: secrets.token_hex(16)}
+
+    def start(self, name, workers, port):
+        module, args = SERVERS[name]
+        command = [sys.executable, '-m', module] + [a.format(workers=workers, port=port) for a in args]
+        server = subprocess.Popen(command, env=dict(os.environ), stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f"{name} server exited: {server.stderr.read().decode()[-2000:]}")
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=1).close()
+                return server
+            except OSError:
+                time.sleep(0.2)
+        server.terminate()
+        raise CommandError(f"{name} server did not start listening on port {port}.")
+
+    def drive(self, port, plan, concurrency, duration):
+        cookie = '; '.join(f'{k}={v}' for k, v in plan['cookies'].items())
+        headers = {'Cookie': cookie, 'Host': f'127.0.0.1:{port}'}
+        post_headers = dict(headers, **{'Content-Type': 'application/x-www-form-urlencoded'})
+        timings, errors = [], []
+        lock = threading.Lock()
+        barrier = threading.Barrier(concurrency + 1)
+        stop = []
+
+        def client(offset):
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+            mine, failed, n = [], 0, offset
+            barrier.wait()
+            while not stop:
+                n += 1
+                if plan['every'] and n % plan['every'] == 0:
+                    method, path, body, sent = 'POST', plan['donate'][0], plan['donate'][1], post_headers
+                else:
+                    method, path, body, sent = 'GET', plan['paths'][n % len(plan['paths'])], None, headers
+                start = time.perf_counter()
+                try:
+                    conn.request(method, path, body=body, headers=sent)
+                    response = conn.getresponse()
+                    response.read()
+                    if response.status >= 400:
+                        failed += 1
+                    mine.append(time.perf_counter() - start)
+                except (OSError, http.client.HTTPException):
+                    failed += 1
+                    conn.close()
+            conn.close()
+            with lock:
+                timings.extend(mine)
+                errors.append(failed)
+
+        threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+        for t in threads:
+            t.start()
+        barrier.wait()
+        start = time.perf_counter()
+        time.sleep(duration)
+        stop.append(True)
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+
+        ordered = sorted(timings) or [0.0]
+        return {
+            'concurrency': concurrency,
+            'requests': len(timings),
+            'errors': sum(errors),
+            'seconds': round(elapsed, 2),
+            'requests_per_second': round(len(timings) / elapsed, 1),
+            'p50_ms': round(statistics.median(ordered) * 1000, 2),
+            'p99_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000, 2),
+        }
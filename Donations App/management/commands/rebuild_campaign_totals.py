@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from DonationsApp import ledger
+
+
+class Command(BaseCommand):
+    help = "Recompute Campaign.collected_amount from the contribution ledger."
+
+    def add_arguments(self, parser):
+        parser.add_argument('campaign_ids', nargs='*', type=int, help="Only rebuild these campaigns.")
+        parser.add_argument(
+            '--backfill', action='store_true',
+            help="First add ledger rows for approved donations that have none.",
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if options['backfill']:
+                created = ledger.backfill_contributions()
+                self.stdout.write(f"Backfilled {created} ledger rows.")
+            updated = ledger.rebuild_totals(options['campaign_ids'] or None)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt totals for {updated} campaigns."))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from DonationsApp import rollups
+
+
+class Command(BaseCommand):
+    help = "Recompute the daily donation rollups from the hot and archived donations."
+
+    def handle(self, *args, **options):
+        count = rollups.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} daily rollup rows."))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from DonationsApp import search
+
+
+class Command(BaseCommand):
+    help = "Create the campaign full-text index if missing and rebuild it from the Campaign table."
+
+    def handle(self, *args, **options):
+        search.rebuild()
+        self.stdout.write(self.style.SUCCESS("Rebuilt the campaign search index."))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from DonationsApp import counters
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute Campaign.donor_count, pending_count and last_donation_at from the hot and "
+        "archived donations, a chunk of campaigns per transaction."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=counters.CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        done = counters.reconcile(options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f"Reconciled counters for {done} campaigns."))
@@ -0,0 +1,117 @@
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from DonationsApp import counters, ledger, rollups
+from DonationsApp.models import Campaign, ContactQuery, Donation, Profile, RecipientRequest
+
+BATCH_SIZE = 1000
+
+
+@contextmanager
+def explicit_timestamps(*fields):
+    """Let bulk_create keep the auto_now_add values we set, to spread rows over time."""
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = "Fill the database with synthetic users, campaigns, donations, queries and recipient requests."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--campaigns', type=int, default=60)
+        parser.add_argument('--donations', type=int, default=5000)
+        parser.add_argument('--queries', type=int, default=500)
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--days', type=int, default=365, help="Spread timestamps over this many past days.")
+        parser.add_argument('--seed', type=int, default=1, help="Random seed, for repeatable datasets.")
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        now = timezone.now()
+        span = timedelta(days=options['days']).total_seconds()
+
+        def past():
+            return now - timedelta(seconds=rng.uniform(0, span))
+
+        prefix = f"seed{options['seed']}-{int(now.timestamp())}"
+        password = make_password('password')  # hash once, hashing per user would dominate
+
+        with transaction.atomic():
+            users = User.objects.bulk_create(
+                (User(username=f'{prefix}-{i}', email=f'{prefix}-{i}@example.com', password=password)
+                 for i in range(max(options['users'], 1))),
+                batch_size=BATCH_SIZE,
+            )
+            roles = ['donor'] * 7 + ['recipient'] * 2 + ['admin']
+            Profile.objects.bulk_create(
+                (Profile(user=u, role=rng.choice(roles), phone=f'9{rng.randrange(10**9):09d}', address='Seed St')
+                 for u in users),
+                batch_size=BATCH_SIZE,
+            )
+            categories = [c for c, _ in Campaign.CATEGORY_CHOICES]
+            campaigns = Campaign.objects.bulk_create(
+                (Campaign(title=f'{categories[i % len(categories)].title()} campaign {i}',
+                          description='Synthetic campaign for load testing.',
+                          goal_amount=Decimal(rng.randrange(10, 500)) * 1000,
+                          created_by=rng.choice(users), category=categories[i % len(categories)])
+                 for i in range(max(options['campaigns'], 1))),
+                batch_size=BATCH_SIZE,
+            )
+
+            with explicit_timestamps(Donation._meta.get_field('donated_at'),
+                                     ContactQuery._meta.get_field('sent_at'),
+                                     RecipientRequest._meta.get_field('created_at')):
+                Donation.objects.bulk_create(
+                    (self.donation(rng, users, campaigns, past()) for _ in range(options['donations'])),
+                    batch_size=BATCH_SIZE,
+                )
+                ContactQuery.objects.bulk_create(
+                    (ContactQuery(user=u, name=u.username, email=u.email, subject='Question',
+                                  message='Synthetic query.', sent_at=past())
+                     for u in (rng.choice(users) for _ in range(options['queries']))),
+                    batch_size=BATCH_SIZE,
+                )
+                RecipientRequest.objects.bulk_create(
+                    (RecipientRequest(user=rng.choice(users), description='Synthetic request.',
+                                      family_income=Decimal(rng.randrange(1000, 50000)),
+                                      is_approved=state == 'approved', is_rejected=state == 'rejected',
+                                      created_at=past())
+                     for state in (rng.choice(['pending', 'approved', 'rejected']) for _ in range(options['requests']))),
+                    batch_size=BATCH_SIZE,
+                )
+
+            # Derive campaign totals and reports from the approved rows, as approvals would have
+            ledger.backfill_contributions()
+            ledger.rebuild_totals([c.pk for c in campaigns])
+        rollups.rebuild()
+        counters.reconcile()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {len(users)} users, {len(campaigns)} campaigns, {options['donations']} donations, "
+            f"{options['queries']} queries and {options['requests']} recipient requests."
+        ))
+
+    @staticmethod
+    def donation(rng, users, campaigns, donated_at):
+        state = rng.choices(['pending', 'approved', 'rejected'], weights=[3, 6, 1])[0]
+        user = rng.choice(users)
+        kind = rng.choices(['money', 'goods'], weights=[4, 1])[0]
+        return Donation(
+            donation_type=kind, user=user, name=user.username, email=user.email, phone='9000000000',
+            campaign=rng.choice(campaigns), amount=Decimal(rng.randrange(100, 50000)) / 10,
+            donated_at=donated_at, is_approved=state == 'approved', is_rejected=state == 'rejected',
+        )
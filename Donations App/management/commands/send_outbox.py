@@ -0,0 +1,40 @@
+import time
+
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+
+from DonationsApp import outbox
+
+
+class Command(BaseCommand):
+    help = "Deliver queued outbox mail in batches over one reused mail connection."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--max-attempts', type=int, default=outbox.MAX_ATTEMPTS)
+        parser.add_argument('--loop', action='store_true', help="Keep polling instead of exiting when the outbox is empty.")
+        parser.add_argument('--interval', type=float, default=5.0, help="Seconds to sleep between polls with --loop.")
+
+    def handle(self, *args, **options):
+        connection = get_connection()
+        sent = 0
+        try:
+            while True:
+                count = outbox.drain(
+                    batch_size=options['batch_size'],
+                    connection=connection,
+                    max_attempts=options['max_attempts'],
+                )
+                sent += count
+                if count:
+                    continue
+                if not options['loop']:
+                    break
+                # Idle: drop the connection rather than hold an SMTP session open
+                connection.close()
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            connection.close()
+        self.stdout.write(f"Processed {sent} outbox messages.")
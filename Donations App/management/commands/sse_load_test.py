@@ -0,0 +1,149 @@
+import asyncio
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.urls import reverse
+
+from DonationsApp import approvals
+from DonationsApp.models import Campaign, CampaignContribution, Donation
+
+from .load_test import Command as LoadTest
+
+
+def rss_kb(pid):
+    with open(f'/proc/{pid}/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])
+    return 0
+
+
+class Command(BaseCommand):
+    help = (
+        "Open many idle subscribers to the campaign progress stream on one uvicorn worker, "
+        "approve donations from this process and measure server memory per connection and "
+        "how long each approval takes to reach every subscriber. Needs uvicorn; Linux only (/proc)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--subscribers', type=int, default=2000)
+        parser.add_argument('--rounds', type=int, default=5, help="Approvals to push through, one at a time.")
+        parser.add_argument('--interval', type=float, default=2.0, help="Seconds between approvals.")
+        parser.add_argument('--port', type=int, default=8766)
+        parser.add_argument('--output', '-o', help="Write the JSON report to this file.")
+
+    def handle(self, *args, **options):
+        load = LoadTest()
+        campaign = Campaign.objects.order_by('pk').first()
+        if campaign is None:
+            raise CommandError("No campaigns; run seed_data first.")
+        cookie = '; '.join(f'{k}={v}' for k, v in load.cookies(load.load_user()).items())
+        path = f"{reverse('campaign_progress')}?category={campaign.category}"
+
+        server = load.start('asgi', 1, options['port'])
+        donations = []
+        try:
+            time.sleep(1)
+            report = asyncio.run(self.run(server.pid, campaign, cookie, path, donations, options))
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+            # Reverse the credits, then drop the donations and their (now net zero) ledger rows
+            ids = [d.pk for d in donations]
+            approvals.reject_donations(ids)
+            CampaignContribution.objects.filter(donation_id__in=ids).delete()
+            Donation.objects.filter(pk__in=ids).delete()
+
+        for name, round_ in report['rounds'].items():
+            self.stderr.write(
+                f"round {name}: {round_['delivered']}/{report['connected']} delivered  "
+                f"p50 {round_['p50_ms']:.0f} ms  p99 {round_['p99_ms']:.0f} ms  max {round_['max_ms']:.0f} ms"
+            )
+        self.stderr.write(
+            f"{report['connected']} subscribers: server RSS {report['rss_idle_mb']} -> {report['rss_connected_mb']} MB, "
+            f"{report['kb_per_subscriber']} KB per subscriber"
+        )
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output)
+        else:
+            self.stdout.write(output)
+
+    async def run(self, pid, campaign, cookie, path, donations, options):
+        rss_idle = rss_kb(pid)
+        arrivals = {}  # delta -> [arrival times]
+        request = (
+            f"GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nCookie: {cookie}\r\nAccept: text/event-stream\r\n\r\n"
+        ).encode()
+        limit = asyncio.Semaphore(100)
+        connected = []
+
+        async def subscribe():
+            async with limit:
+                reader, writer = await asyncio.open_connection('127.0.0.1', options['port'], limit=2 ** 20)
+                writer.write(request)
+                status = await reader.readline()
+                if b' 200 ' not in status:
+                    raise CommandError(f"Stream refused: {status.decode().strip()}")
+                await reader.readuntil(b'\r\n\r\n')
+                connected.append(writer)
+            try:
+                while True:
+                    # Chunked transfer framing is ignored; event lines are matched as they arrive
+                    line = await reader.readline()
+                    if not line:
+                        return
+                    if line.startswith(b'data: {'):
+                        arrivals.setdefault(json.loads(line[6:])['delta'], []).append(time.perf_counter())
+            except (ConnectionError, asyncio.CancelledError):
+                return
+
+        readers = [asyncio.ensure_future(subscribe()) for _ in range(options['subscribers'])]
+        while len(connected) < options['subscribers']:
+            failed = [r for r in readers if r.done() and r.exception()]
+            if failed:
+                raise failed[0].exception()
+            await asyncio.sleep(0.1)
+        await asyncio.sleep(1)
+        rss_connected = rss_kb(pid)
+
+        sent = {}
+        for n in range(1, options['rounds'] + 1):
+            donation = await asyncio.to_thread(self.approve, campaign, n)
+            sent[f'{n}.00'] = time.perf_counter()
+            donations.append(donation)
+            await asyncio.sleep(options['interval'])
+
+        for writer in connected:
+            writer.close()
+        for r in readers:
+            r.cancel()
+        await asyncio.gather(*readers, return_exceptions=True)
+
+        rounds = {}
+        for delta, start in sent.items():
+            latencies = sorted((t - start) * 1000 for t in arrivals.get(delta, [])) or [float('nan')]
+            rounds[delta] = {
+                'delivered': len(arrivals.get(delta, [])),
+                'p50_ms': round(statistics.median(latencies), 1),
+                'p99_ms': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))], 1),
+                'max_ms': round(latencies[-1], 1),
+            }
+        return {
+            'connected': len(connected),
+            'rss_idle_mb': round(rss_idle / 1024, 1),
+            'rss_connected_mb': round(rss_connected / 1024, 1),
+            'kb_per_subscriber': round((rss_connected - rss_idle) / max(len(connected), 1), 1),
+            'rounds': rounds,
+        }
+
+    def approve(self, campaign, amount):
+        # Runs in a worker thread: the approval commits from this process, not the server's
+        with transaction.atomic():
+            donation = Donation.objects.create(campaign=campaign, name='sse-load', amount=amount)
+        approvals.approve_donation(donation.pk)
+        return donation
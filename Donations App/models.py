@@ -1,5 +1,7 @@
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import User
+from . import documents
 
 class Profile(models.Model):
     ROLE_CHOICES = [
@@ -42,12 +44,27 @@ class Campaign(models.Model):
         choices=CATEGORY_CHOICES,
         default='education'  # ✅ Default added to avoid migration prompt
     )
+    # Kept in step by counters.py so listings need no COUNT(*) per campaign;
+    # reconcile_campaign_counters recomputes them. donor_count is approved
+    # donations, hot and archived; last_donation_at the newest of them.
+    donor_count = models.IntegerField(default=0)
+    pending_count = models.IntegerField(default=0)
+    last_donation_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['category', 'id'], name='campaign_category_idx'),
+        ]
 
     def _str_(self):
         return self.title
 
+    def has_donations(self):
+        """Whether any donation, hot or archived, was ever made to this campaign."""
+        return self.donation_set.exists() or self.archiveddonation_set.exists()
+
 
-class Donation(models.Model):
+class AbstractDonation(models.Model):
     DONATION_TYPE = (
         ('money', 'Money'),
         ('goods', 'Physical Items'),
@@ -76,10 +93,99 @@ class Donation(models.Model):
     is_approved = models.BooleanField(default=False)
     is_rejected = models.BooleanField(default=False)
 
+    class Meta:
+        abstract = True
+
     def _str_(self):
         return f"{self.name} - {self.donation_type}"
 
 
+class Donation(AbstractDonation):
+    class Meta:
+        # Listings page newest-first on (donated_at, id); see pagination.py.
+        indexes = [
+            models.Index(fields=['donated_at', 'id'], name='donation_date_idx'),
+            models.Index(fields=['user', 'donated_at', 'id'], name='donation_user_date_idx'),
+            models.Index(
+                fields=['donated_at', 'id'], name='donation_pending_idx',
+                condition=models.Q(is_approved=False, is_rejected=False),
+            ),
+            models.Index(
+                fields=['donated_at', 'id'], name='donation_approved_idx',
+                condition=models.Q(is_approved=True, is_rejected=False),
+            ),
+        ]
+
+
+class ArchivedDonation(AbstractDonation):
+    # Settled donations moved out of Donation by archive.py. The id is the one
+    # the row had as a Donation, so ids are unique across both tables and
+    # ledger rows still point at it.
+    id = models.BigIntegerField(primary_key=True)
+    # PROTECT, not CASCADE: deleting a campaign must never erase its donation history
+    campaign = models.ForeignKey(Campaign, on_delete=models.PROTECT)
+    donated_at = models.DateTimeField()
+    archived_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['donated_at', 'id'], name='archive_date_idx'),
+            models.Index(fields=['user', 'donated_at', 'id'], name='archive_user_date_idx'),
+            models.Index(
+                fields=['donated_at', 'id'], name='archive_approved_idx',
+                condition=models.Q(is_approved=True, is_rejected=False),
+            ),
+        ]
+
+
+class CampaignContribution(models.Model):
+    # Append-only ledger: one row per credit (approval) or debit (reversal).
+    # Campaign.collected_amount is the running total of these rows.
+    campaign = models.ForeignKey(Campaign, on_delete=models.PROTECT, related_name='contributions')
+    # No constraint: the donation may since have moved to ArchivedDonation,
+    # and its ledger rows must stay for collected_amount to add up.
+    donation = models.ForeignKey(
+        Donation, on_delete=models.DO_NOTHING, db_constraint=False, related_name='contributions',
+    )
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.campaign_id} {self.amount:+}"
+
+
+class DonationDailyRollup(models.Model):
+    # Approved donations per campaign per day (by donated_at), kept up to date
+    # by approvals.py and rebuilt by the rebuild_rollups command. Reports read
+    # these rows instead of aggregating the Donation table.
+    day = models.DateField()
+    campaign = models.ForeignKey(Campaign, on_delete=models.CASCADE, related_name='daily_rollups')
+    category = models.CharField(max_length=30, choices=Campaign.CATEGORY_CHOICES)
+    money_count = models.IntegerField(default=0)
+    money_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    goods_count = models.IntegerField(default=0)
+    goods_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'campaign'], name='rollup_day_campaign_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['category', 'day'], name='rollup_category_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.campaign_id}"
+
+    @property
+    def donation_count(self):
+        return self.money_count + self.goods_count
+
+    @property
+    def approved_amount(self):
+        return self.money_amount + self.goods_amount
+
+
 class ContactQuery(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     name = models.CharField(max_length=100)
@@ -88,6 +194,11 @@ class ContactQuery(models.Model):
     message = models.TextField()
     sent_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['sent_at', 'id'], name='contactquery_sent_idx'),
+        ]
+
     def _str_(self):
         return f'Message from {self.name}'
 
@@ -111,22 +222,87 @@ class Organization(models.Model):
         default='temple'
     )
     image = models.ImageField(upload_to='organization_images/', blank=True, null=True)
+    # Resized copies built by thumbnails.py: {'source': name, 'webp': {'1x': name, '2x': name}, 'jpeg': {...}}
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
 
     def _str_(self):
         return self.name
 
+    def _variant_srcset(self, ext):
+        variants = self.image_variants.get(ext)
+        if not variants or self.image_variants.get('source') != self.image.name:
+            return ''
+        return ', '.join(f"{self.image.storage.url(name)} {density}" for density, name in variants.items())
+
+    @property
+    def webp_srcset(self):
+        return self._variant_srcset('webp')
+
+    @property
+    def jpeg_srcset(self):
+        return self._variant_srcset('jpeg')
+
+    @property
+    def thumbnail_url(self):
+        jpeg = self.image_variants.get('jpeg')
+        if jpeg and self.image_variants.get('source') == self.image.name:
+            return self.image.storage.url(jpeg['1x'])
+        return self.image.url
+
 
 class RecipientRequest(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     aadhaar_number = models.CharField(max_length=12, default='000000000000')
     ration_card_number = models.CharField(max_length=20, default='UNKNOWN')
-    aadhaar_file = models.FileField(upload_to='aadhaar_files/', null=True, blank=True)
-    ration_card_file = models.FileField(upload_to='ration_card_files/', null=True, blank=True)
+    # Stored content-addressed under documents/ (see documents.DocumentStorage)
+    aadhaar_file = models.FileField(
+        upload_to='aadhaar_files/', storage=documents.storage, validators=[documents.validate_extension],
+        null=True, blank=True,
+    )
+    ration_card_file = models.FileField(
+        upload_to='ration_card_files/', storage=documents.storage, validators=[documents.validate_extension],
+        null=True, blank=True,
+    )
     family_income = models.DecimalField(max_digits=10, decimal_places=2, default=0.0)
     description = models.TextField()
     is_approved = models.BooleanField(default=False)
     is_rejected = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='recipientreq_created_idx'),
+            models.Index(fields=['user', 'created_at', 'id'], name='recipientreq_user_idx'),
+        ]
+
     def _str_(self):
-        return f"{self.user.username} - {self.aadhaar_number}"
\ No newline at end of file
+        return f"{self.user.username} - {self.aadhaar_number}"
+
+
+class OutboxEmail(models.Model):
+    # Mail is written here in the same transaction as the state change it
+    # announces and delivered later by the send_outbox command.
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254, blank=True)
+    recipients = models.TextField()  # comma-separated
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    claimed_by = models.CharField(max_length=32, blank=True)  # drain() run that is sending it
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'next_attempt_at'])]
+
+    def __str__(self):
+        return f"{self.subject} -> {self.recipients}"
@@ -0,0 +1,121 @@
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.utils import timezone
+
+from .models import OutboxEmail
+
+MAX_ATTEMPTS = 5
+BACKOFF_BASE = timedelta(seconds=30)
+BACKOFF_CAP = timedelta(hours=1)
+# A claimed batch that is neither sent nor failed by then (the worker died)
+# is due again
+CLAIM_TIMEOUT = timedelta(minutes=10)
+
+
+def queue_mail(subject, message, from_email, recipient_list):
+    """Drop-in replacement for send_mail() that only writes to the outbox.
+
+    Call it inside the transaction that makes the change being announced, so
+    the mail is queued if and only if that change commits.
+    """
+    return OutboxEmail.objects.create(
+        subject=subject,
+        body=message,
+        from_email=from_email or '',
+        recipients=','.join(recipient_list),
+    )
+
+
+def queue_many(messages):
+    """Queue (subject, message, from_email, recipient_list) tuples in one INSERT batch."""
+    rows = [
+        OutboxEmail(subject=subject, body=message, from_email=from_email or '', recipients=','.join(recipients))
+        for subject, message, from_email, recipients in messages
+    ]
+    return OutboxEmail.objects.bulk_create(rows, batch_size=500)
+
+
+def backoff(attempts):
+    return min(BACKOFF_BASE * (2 ** (attempts - 1)), BACKOFF_CAP)
+
+
+def _due(now):
+    return OutboxEmail.objects.filter(status__in=('pending', 'sending'), next_attempt_at__lte=now)
+
+
+def claim(batch_size, now):
+    """Mark up to batch_size due messages as being sent by this run and return them.
+
+    The UPDATE only takes rows that are still due, so when two drains race
+    for the same rows each row goes to exactly one of them; the other sees
+    it as already claimed and skips it.
+    """
+    ids = list(_due(now).order_by('id').values_list('pk', flat=True)[:batch_size])
+    if not ids:
+        return []
+    token = uuid.uuid4().hex
+    _due(now).filter(pk__in=ids).update(
+        status='sending', claimed_by=token, next_attempt_at=now + CLAIM_TIMEOUT,
+    )
+    return list(OutboxEmail.objects.filter(pk__in=ids, claimed_by=token).order_by('id'))
+
+
+def drain(batch_size=100, connection=None, max_attempts=MAX_ATTEMPTS):
+    """Send one batch of due mail over a single connection. Returns the batch size.
+
+    The batch is claimed first (see claim()), so overlapping send_outbox
+    runs never deliver the same message twice. Each message is sent
+    separately on the open connection so one bad address only retries that
+    message. Failures are rescheduled with exponential backoff and marked
+    failed after max_attempts.
+    """
+    now = timezone.now()
+    batch = claim(batch_size, now)
+    if not batch:
+        return 0
+
+    own_connection = connection is None
+    connection = connection or get_connection()
+    try:
+        connection.open()
+        opened = True
+    except Exception as exc:
+        opened = False
+        open_error = exc
+
+    for item in batch:
+        item.attempts += 1
+        item.status = 'pending'
+        item.claimed_by = ''
+        try:
+            if not opened:
+                raise open_error
+            message = EmailMessage(
+                subject=item.subject,
+                body=item.body,
+                from_email=item.from_email or settings.DEFAULT_FROM_EMAIL,
+                to=item.recipients.split(','),
+                connection=connection,
+            )
+            message.send(fail_silently=False)
+        except Exception as exc:
+            item.last_error = str(exc)
+            if item.attempts >= max_attempts:
+                item.status = 'failed'
+            else:
+                item.next_attempt_at = now + backoff(item.attempts)
+        else:
+            item.status = 'sent'
+            item.sent_at = timezone.now()
+            item.last_error = ''
+
+    if own_connection and opened:
+        connection.close()
+
+    OutboxEmail.objects.bulk_update(
+        batch, ['status', 'claimed_by', 'attempts', 'last_error', 'next_attempt_at', 'sent_at']
+    )
+    return len(batch)
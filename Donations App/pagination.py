@@ -0,0 +1,127 @@
+import base64
+import binascii
+from itertools import chain
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+PER_PAGE = 50
+
+
+def encode_cursor(value, pk):
+    raw = f"{value.isoformat()}|{pk}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return (datetime, pk) or None for a missing or malformed cursor."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        value, pk = raw.rsplit('|', 1)
+        value = parse_datetime(value)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if value is None:
+        return None
+    return value, pk
+
+
+def _key(row, field):
+    # Model instances, or .values() rows that carry field and id
+    if isinstance(row, dict):
+        return row[field], row['id']
+    return getattr(row, field), row.pk
+
+
+class CursorPage:
+    """One page of a newest-first listing plus the cursors around it."""
+
+    def __init__(self, items, field, has_next, has_prev):
+        self.items = items
+        self.has_next = has_next
+        self.has_prev = has_prev
+        self.next_cursor = encode_cursor(*_key(items[-1], field)) if has_next else None
+        self.prev_cursor = encode_cursor(*_key(items[0], field)) if has_prev else None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __bool__(self):
+        return bool(self.items)
+
+
+def _page_query(request, queryset, field, per_page):
+    """The slice to fetch for this page, and a function that turns its rows into a CursorPage."""
+    after = decode_cursor(request.GET.get('after'))
+    before = decode_cursor(request.GET.get('before'))
+
+    if before:
+        value, pk = before
+        rows = (
+            queryset.filter(Q(**{f'{field}__gt': value}) | Q(**{field: value, 'pk__gt': pk}))
+            .order_by(field, 'pk')[:per_page + 1]
+        )
+
+        def finish(rows):
+            items = rows[:per_page][::-1]
+            return CursorPage(items, field, True, len(rows) > per_page) if items else CursorPage([], field, False, False)
+    else:
+        if after:
+            value, pk = after
+            queryset = queryset.filter(Q(**{f'{field}__lt': value}) | Q(**{field: value, 'pk__lt': pk}))
+        rows = queryset.order_by(f'-{field}', '-pk')[:per_page + 1]
+
+        def finish(rows):
+            items = rows[:per_page]
+            return CursorPage(items, field, len(rows) > per_page, after is not None) if items else CursorPage([], field, False, False)
+
+    return rows, finish
+
+
+def paginate(request, queryset, field, per_page=PER_PAGE):
+    """Keyset-paginate queryset newest-first on (field, id).
+
+    ?after=<cursor> moves to older rows and ?before=<cursor> to newer ones.
+    Each page is a range scan from the cursor position, so page 1000 costs the
+    same as page 1 (given an index on (field, id)).
+    """
+    rows, finish = _page_query(request, queryset, field, per_page)
+    return finish(list(rows))
+
+
+async def apaginate(request, queryset, field, per_page=PER_PAGE):
+    """paginate() for async views, fetching the page with the async ORM."""
+    rows, finish = _page_query(request, queryset, field, per_page)
+    return finish([row async for row in rows])
+
+
+def _merge(request, pages, field, per_page):
+    # Each slice is already in page order; keep the first per_page + 1 overall
+    newest_first = decode_cursor(request.GET.get('before')) is None
+    rows = sorted(chain(*pages), key=lambda row: _key(row, field), reverse=newest_first)
+    return rows[:per_page + 1]
+
+
+def paginate_across(request, querysets, field, per_page=PER_PAGE):
+    """paginate() over the union of querysets whose pks do not overlap.
+
+    Used for hot plus archived donations: each queryset is range-scanned from
+    the cursor on its own index and the slices are merged, so a page costs
+    one query per queryset.
+    """
+    queries = [_page_query(request, queryset, field, per_page) for queryset in querysets]
+    finish = queries[0][1]
+    return finish(_merge(request, [list(rows) for rows, _ in queries], field, per_page))
+
+
+async def apaginate_across(request, querysets, field, per_page=PER_PAGE):
+    """paginate_across() for async views."""
+    queries = [_page_query(request, queryset, field, per_page) for queryset in querysets]
+    finish = queries[0][1]
+    return finish(_merge(request, [[row async for row in rows] for rows, _ in queries], field, per_page))
@@ -0,0 +1,216 @@
+import asyncio
+import json
+import logging
+from collections import defaultdict, deque
+from decimal import Decimal
+from importlib import import_module
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import auth
+from django.db import close_old_connections
+from django.http import HttpRequest, parse_cookie
+from django.urls import reverse
+
+from .models import Campaign, CampaignContribution
+
+logger = logging.getLogger(__name__)
+
+HISTORY = 1024  # events kept for clients reconnecting with Last-Event-ID
+POLL_INTERVAL = 1  # seconds between ledger checks while anyone is listening
+HEARTBEAT = 15  # seconds between keep-alive comments on idle streams
+BATCH = 1000
+RETRY_MS = 5000
+
+
+def _poll(func, *args):
+    # The feed queries outside Django's request cycle, so nothing else closes
+    # the connection they open: do what request_started/request_finished do
+    close_old_connections()
+    try:
+        return func(*args)
+    finally:
+        close_old_connections()
+
+
+def ledger_tail():
+    return CampaignContribution.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+
+
+def changes_since(last_id):
+    """(new last id, [(category, event payload)]) for ledger rows after last_id.
+
+    The ledger is append-only and written in the same transaction as
+    collected_amount, so this sees every approval or reversal from any
+    process, WSGI or ASGI. One event per campaign: the summed delta and the
+    new total. The total is authoritative; on PostgreSQL a transaction that
+    commits out of id order can be skipped, and the next event for that
+    campaign corrects it.
+    """
+    rows = list(
+        CampaignContribution.objects.filter(pk__gt=last_id).order_by('pk')
+        .values_list('pk', 'campaign_id', 'amount')[:BATCH]
+    )
+    if not rows:
+        return last_id, []
+    deltas = defaultdict(Decimal)
+    for _, campaign_id, amount in rows:
+        deltas[campaign_id] += amount
+    campaigns = Campaign.objects.filter(pk__in=deltas).values('id', 'category', 'collected_amount', 'goal_amount')
+    return rows[-1][0], [
+        (campaign['category'], {
+            'campaign': campaign['id'],
+            'collected': str(campaign['collected_amount']),
+            'goal': str(campaign['goal_amount']),
+            'delta': str(deltas[campaign['id']]),
+        })
+        for campaign in campaigns
+    ]
+
+
+class Broadcaster:
+    """In-process fan-out of campaign progress to any number of SSE streams.
+
+    A single task follows the ledger while at least one stream is open.
+    Events are encoded once into a bounded log; every subscriber shares the
+    log and one "something changed" future, so an idle connection costs a
+    suspended coroutine and a sequence number rather than a queue. A
+    subscriber that falls more than HISTORY events behind is told to reload.
+    """
+
+    def __init__(self, history=HISTORY):
+        self.events = deque(maxlen=history)  # (seq, category, encoded event)
+        self.seq = 0
+        self.subscribers = 0
+        self.loop = None
+        self.watcher = None
+        self._changed = None
+
+    def bind(self, loop):
+        if self.loop is loop:
+            return
+        self.loop = loop
+        self._changed = loop.create_future()
+        self.watcher = loop.create_task(self._watch())
+
+    async def _watch(self):
+        last_id, idle = None, 0
+        while True:
+            await asyncio.sleep(POLL_INTERVAL)
+            if not self.subscribers:
+                last_id = None  # nobody missed anything; pick up from the tail next time
+                continue
+            try:
+                # Off the request thread, so a slow poll never holds up a view
+                if last_id is None:
+                    last_id = await sync_to_async(_poll, thread_sensitive=False)(ledger_tail)
+                last_id, items = await sync_to_async(_poll, thread_sensitive=False)(changes_since, last_id)
+            except Exception:
+                logger.exception("Campaign progress poll failed")
+                items = []
+            idle += POLL_INTERVAL
+            if items:
+                self.publish(items)
+                idle = 0
+            elif idle >= HEARTBEAT:
+                # Waking idle streams makes each of them send a keep-alive
+                self._wake()
+                idle = 0
+
+    def _wake(self):
+        changed, self._changed = self._changed, self.loop.create_future()
+        changed.set_result(None)
+
+    def publish(self, items):
+        """Append (category, payload) items to the log and wake subscribers."""
+        for category, payload in items:
+            self.seq += 1
+            data = json.dumps(payload, separators=(',', ':'))
+            self.events.append((self.seq, category, f"id: {self.seq}\nevent: progress\ndata: {data}\n\n".encode()))
+        self._wake()
+
+    def since(self, seq, category):
+        """Encoded events after seq for category, or None if seq is unknown here.
+
+        That is when it is older than the log, or from before a restart.
+        """
+        if seq > self.seq or (self.events and seq < self.events[0][0] - 1):
+            return None
+        return [event for n, cat, event in self.events if n > seq and (category is None or cat == category)]
+
+    @property
+    def changed(self):
+        """Future resolved on the next publish or heartbeat."""
+        return self._changed
+
+
+broadcaster = Broadcaster()
+
+
+def stream_path():
+    return reverse('campaign_progress')
+
+
+def _user(headers):
+    # The session and auth lookups django.contrib.auth does for a view
+    request = HttpRequest()
+    request.COOKIES = parse_cookie(headers.get(b'cookie', b'').decode('latin-1'))
+    engine = import_module(settings.SESSION_ENGINE)
+    request.session = engine.SessionStore(request.COOKIES.get(settings.SESSION_COOKIE_NAME))
+    return auth.get_user(request)
+
+
+async def _respond(send, status):
+    await send({'type': 'http.response.start', 'status': status, 'headers': [(b'content-type', b'text/plain')]})
+    await send({'type': 'http.response.body', 'body': b''})
+
+
+async def sse_app(scope, receive, send):
+    """Raw ASGI app for GET <stream_path>?category=<slug>.
+
+    Bypasses Django's request handling: Django 4.2 does not notice a client
+    going away while it streams, so each dropped connection would leak a
+    generator. Here a pending receive() reports the disconnect.
+    """
+    await receive()  # the (empty) GET body
+    headers = dict(scope['headers'])
+    if scope['method'] != 'GET':
+        return await _respond(send, 405)
+    user = await sync_to_async(_user)(headers)
+    if not user.is_authenticated:
+        return await _respond(send, 403)
+    category = parse_qs(scope['query_string'].decode()).get('category', [None])[0]
+    if category is not None and category not in dict(Campaign.CATEGORY_CHOICES):
+        return await _respond(send, 404)
+    try:
+        seq = int(headers.get(b'last-event-id', b''))
+    except ValueError:
+        seq = broadcaster.seq
+
+    broadcaster.bind(asyncio.get_running_loop())
+    await send({'type': 'http.response.start', 'status': 200, 'headers': [
+        (b'content-type', b'text/event-stream'),
+        (b'cache-control', b'no-cache'),
+        (b'x-accel-buffering', b'no'),  # nginx would otherwise hold events back
+    ]})
+    await send({'type': 'http.response.body', 'body': f"retry: {RETRY_MS}\n\n".encode(), 'more_body': True})
+
+    disconnected = asyncio.ensure_future(receive())
+    broadcaster.subscribers += 1
+    try:
+        while True:
+            if seq == broadcaster.seq:
+                # Waiting on the shared future adds a callback to it, not a task
+                await asyncio.wait([broadcaster.changed, disconnected], return_when=asyncio.FIRST_COMPLETED)
+                if disconnected.done():
+                    break
+            events = broadcaster.since(seq, category)
+            if events is None:
+                events = [b"event: reload\ndata: {}\n\n"]
+            seq = broadcaster.seq
+            # Also picks up events published while the previous send was blocked
+            await send({'type': 'http.response.body', 'body': b''.join(events) or b": ping\n\n", 'more_body': True})
+    finally:
+        broadcaster.subscribers -= 1
+        disconnected.cancel()
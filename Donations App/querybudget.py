@@ -0,0 +1,97 @@
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def query_budget(limit):
+    """Declare the most queries a view may run per request (session and user lookups included)."""
+    def decorator(view_func):
+        view_func.query_budget = limit
+        return view_func
+    return decorator
+
+
+class _Recorder:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - start
+
+
+def _install(recorder):
+    connection.execute_wrappers.append(recorder)
+
+
+def _uninstall(recorder):
+    connection.execute_wrappers.remove(recorder)
+
+
+class QueryBudgetMiddleware:
+    """Count queries and SQL time per request and check them against the view's budget.
+
+    Over-budget requests are logged, or raise QueryBudgetExceeded when
+    QUERY_BUDGET_STRICT is set (as the tests do), so an N+1 regression fails
+    the suite. With DEBUG or QUERY_BUDGET_STRICT the numbers also go out in a
+    Server-Timing header; never in production, where they would tell any
+    client how much database work each view does.
+
+    It runs natively under both WSGI and ASGI, so async views are not pushed
+    back onto a thread by this middleware.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        recorder = _Recorder()
+        with connection.execute_wrapper(recorder):
+            response = self.get_response(request)
+        return self.check(request, response, recorder)
+
+    async def __acall__(self, request):
+        # Connections are per thread and the async ORM runs its queries on the
+        # request's sync thread, so the recorder is installed there
+        recorder = _Recorder()
+        await sync_to_async(_install)(recorder)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(_uninstall)(recorder)
+        return self.check(request, response, recorder)
+
+    def check(self, request, response, recorder):
+        strict = getattr(settings, 'QUERY_BUDGET_STRICT', False)
+        if settings.DEBUG or strict:
+            response['Server-Timing'] = f'db;dur={recorder.duration * 1000:.1f};desc="{recorder.count} queries"'
+        budget = getattr(request, 'query_budget', None)
+        if budget is not None and recorder.count > budget:
+            message = f"{request.path} ran {recorder.count} queries, budget is {budget}"
+            if strict:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.query_budget = getattr(view_func, 'query_budget', None)
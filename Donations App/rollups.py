@@ -0,0 +1,151 @@
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+from itertools import chain
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, DecimalField, F, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from .models import ArchivedDonation, Donation, DonationDailyRollup
+
+# Fields approvals.py must read for each donation it settles
+DONATION_FIELDS = ('campaign_id', 'campaign__category', 'donated_at', 'donation_type', 'amount')
+
+COUNTERS = ('money_count', 'money_amount', 'goods_count', 'goods_amount')
+
+
+def _zero():
+    return {'money_count': 0, 'money_amount': Decimal('0'), 'goods_count': 0, 'goods_amount': Decimal('0')}
+
+
+def _apply_one(day, campaign_id, category, delta):
+    increments = {field: F(field) + value for field, value in delta.items()}
+    rollup = DonationDailyRollup.objects.filter(day=day, campaign_id=campaign_id)
+    if rollup.update(**increments):
+        return
+    try:
+        with transaction.atomic():
+            DonationDailyRollup.objects.create(day=day, campaign_id=campaign_id, category=category, **delta)
+    except IntegrityError:
+        # Created concurrently between our UPDATE and INSERT
+        rollup.update(**increments)
+
+
+def apply(rows, sign):
+    """Add (sign=1) or remove (sign=-1) approved donations from the daily rollups.
+
+    rows are dicts carrying DONATION_FIELDS. Deltas are summed per (day,
+    campaign) first, so a bulk approval touches each rollup row once: rows
+    that exist are incremented with one executemany(), the rest inserted
+    together.
+    """
+    deltas = defaultdict(_zero)
+    for r in rows:
+        day = timezone.localdate(r['donated_at'])
+        delta = deltas[(day, r['campaign_id'], r['campaign__category'])]
+        kind = 'goods' if r['donation_type'] == 'goods' else 'money'
+        delta[f'{kind}_count'] += sign
+        delta[f'{kind}_amount'] += sign * Decimal(r['amount'] or 0)
+    if not deltas:
+        return
+
+    existing = {
+        (day, campaign_id): pk
+        for pk, day, campaign_id in DonationDailyRollup.objects.filter(
+            day__in={key[0] for key in deltas}, campaign_id__in={key[1] for key in deltas},
+        ).values_list('pk', 'day', 'campaign_id')
+    }
+    found = [
+        [delta[field] for field in COUNTERS] + [existing[key[:2]]]
+        for key, delta in deltas.items() if key[:2] in existing
+    ]
+    if found:
+        qn = connection.ops.quote_name
+        increments = ', '.join(f"{qn(field)} = {qn(field)} + %s" for field in COUNTERS)
+        with connection.cursor() as cursor:
+            # One statement prepared once for every row, still relative to the stored values
+            cursor.executemany(
+                f"UPDATE {qn(DonationDailyRollup._meta.db_table)} SET {increments} WHERE {qn('id')} = %s", found,
+            )
+
+    missing = [(key, delta) for key, delta in deltas.items() if key[:2] not in existing]
+    if not missing:
+        return
+    try:
+        with transaction.atomic():
+            DonationDailyRollup.objects.bulk_create([
+                DonationDailyRollup(day=day, campaign_id=campaign_id, category=category, **delta)
+                for (day, campaign_id, category), delta in missing
+            ])
+    except IntegrityError:
+        # Some were created concurrently since the read above
+        for key, delta in missing:
+            _apply_one(*key, delta)
+
+
+def rebuild():
+    """Recompute every rollup row from the hot and archived donations. Returns the row count."""
+    totals = defaultdict(_zero)
+    categories = {}
+    approved = [
+        model.objects.filter(is_approved=True)
+        .annotate(day=TruncDate('donated_at'))
+        .values('day', 'campaign_id', 'campaign__category', 'donation_type')
+        .annotate(
+            n=Count('id'),
+            total=Coalesce(Sum('amount'), Value(Decimal('0')), output_field=DecimalField()),
+        )
+        .order_by()
+        for model in (Donation, ArchivedDonation)
+    ]
+    for row in chain.from_iterable(rows.iterator() for rows in approved):
+        key = (row['day'], row['campaign_id'])
+        kind = 'goods' if row['donation_type'] == 'goods' else 'money'
+        totals[key][f'{kind}_count'] += row['n']
+        totals[key][f'{kind}_amount'] += row['total']
+        categories[key] = row['campaign__category']
+
+    with transaction.atomic():
+        DonationDailyRollup.objects.all().delete()
+        DonationDailyRollup.objects.bulk_create(
+            (
+                DonationDailyRollup(day=day, campaign_id=campaign_id, category=categories[(day, campaign_id)], **values)
+                for (day, campaign_id), values in totals.items()
+            ),
+            batch_size=500,
+        )
+    return len(totals)
+
+
+def _sums():
+    # Aliased: an annotation may not reuse the name of a model field
+    return {f'total_{field}': Sum(field) for field in COUNTERS}
+
+
+def _finish(row):
+    for field in COUNTERS:
+        row[field] = row.pop(f'total_{field}')
+    row.pop('total_amount', None)
+    row['donation_count'] = row['money_count'] + row['goods_count']
+    row['approved_amount'] = row['money_amount'] + row['goods_amount']
+    return row
+
+
+def statistics(days=30, top=20):
+    """Report data for the last `days` days, read only from the rollup table."""
+    since = timezone.localdate() - timedelta(days=days - 1)
+    rollups = DonationDailyRollup.objects.filter(day__gte=since)
+    top_campaigns = (
+        rollups.values('campaign_id', 'campaign__title', 'category')
+        .annotate(**_sums())
+        .annotate(total_amount=F('total_money_amount') + F('total_goods_amount'))
+        .order_by('-total_amount', 'campaign_id')[:top]
+    )
+    return {
+        'since': since,
+        'by_category': [_finish(row) for row in rollups.values('category').annotate(**_sums()).order_by('category')],
+        'by_day': [_finish(row) for row in rollups.values('day').annotate(**_sums()).order_by('day')],
+        'top_campaigns': [_finish(row) for row in top_campaigns],
+    }
@@ -0,0 +1,145 @@
+import re
+
+from django.db import connection
+from django.db.models import Count, Q
+
+from .models import Campaign
+
+PER_PAGE = 20
+MAX_TERMS = 8
+FTS_TABLE = 'campaign_search'
+# bm25 column weights: a hit in the title counts ten times one in the description
+TITLE_WEIGHT, DESCRIPTION_WEIGHT = 10.0, 1.0
+
+
+def terms(query):
+    """Plain word tokens of a user query, so no operator syntax reaches MATCH or to_tsquery."""
+    return re.findall(r'\w+', query.lower())[:MAX_TERMS]
+
+
+def _table():
+    return connection.ops.quote_name(Campaign._meta.db_table)
+
+
+def install(using_connection=connection):
+    """Create the full-text index and its sync machinery if missing.
+
+    SQLite gets an external-content FTS5 table over the campaign table plus
+    triggers, so every write path (save, bulk_create, queryset.update, raw SQL)
+    keeps it current. PostgreSQL gets a stored generated tsvector column with a
+    GIN index, which the database maintains itself. Idempotent; run from
+    post_migrate.
+    """
+    table = using_connection.ops.quote_name(Campaign._meta.db_table)
+    with using_connection.cursor() as cursor:
+        if using_connection.vendor == 'sqlite':
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE name = %s", [FTS_TABLE])
+            created = cursor.fetchone() is None
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+                f"title, description, content={table}, content_rowid='id', tokenize='porter unicode61')"
+            )
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {table} BEGIN "
+                f"INSERT INTO {FTS_TABLE}(rowid, title, description) VALUES (new.id, new.title, new.description); END"
+            )
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {table} BEGIN "
+                f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description) "
+                f"VALUES ('delete', old.id, old.title, old.description); END"
+            )
+            # Only title/description edits touch the index, not collected_amount updates
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF title, description ON {table} BEGIN "
+                f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description) "
+                f"VALUES ('delete', old.id, old.title, old.description); "
+                f"INSERT INTO {FTS_TABLE}(rowid, title, description) VALUES (new.id, new.title, new.description); END"
+            )
+            if created:
+                cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+        elif using_connection.vendor == 'postgresql':
+            cursor.execute(
+                f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+                f"setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+                f"setweight(to_tsvector('english', coalesce(description, '')), 'B')) STORED"
+            )
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS campaign_search_idx ON {table} USING GIN (search_vector)")
+
+
+def rebuild():
+    """Rebuild the SQLite index from the campaign table (PostgreSQL needs nothing)."""
+    install()
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def _match():
+    """(FROM/WHERE clause, rank expression, query builder) for this backend."""
+    table = _table()
+    if connection.vendor == 'sqlite':
+        return (
+            f"{FTS_TABLE} JOIN {table} c ON c.id = {FTS_TABLE}.rowid WHERE {FTS_TABLE} MATCH %s",
+            f"bm25({FTS_TABLE}, {TITLE_WEIGHT}, {DESCRIPTION_WEIGHT})",
+            lambda words: ' '.join(f'"{w}"*' for w in words),
+        )
+    return (
+        f"{table} c, to_tsquery('english', %s) q WHERE c.search_vector @@ q",
+        "-ts_rank(c.search_vector, q)",
+        lambda words: ' & '.join(f'{w}:*' for w in words),
+    )
+
+
+def _ranked(words, category, limit, offset):
+    where, rank, build = _match()
+    params = [build(words)]
+    if category:
+        where += " AND c.category = %s"
+        params.append(category)
+    return list(Campaign.objects.raw(
+        f"SELECT c.*, {rank} AS rank FROM {where} ORDER BY rank, c.id LIMIT %s OFFSET %s",
+        params + [limit, offset],
+    ))
+
+
+def _scan(words):
+    # No full-text index on other backends: fall back to substring scans
+    return Campaign.objects.filter(*[Q(title__icontains=w) | Q(description__icontains=w) for w in words])
+
+
+def search(query, category=None, page=1, per_page=PER_PAGE):
+    """Ranked campaigns matching every word of query (as prefixes), plus facets.
+
+    Returns {'results': [...], 'facets': {category: count}, 'total': n}.
+    Facets count all matches, ignoring the category filter, so the page can
+    offer every category that has hits.
+    """
+    words = terms(query)
+    if not words:
+        return {'results': [], 'facets': {}, 'total': 0}
+    offset = (max(page, 1) - 1) * per_page
+
+    if connection.vendor not in ('sqlite', 'postgresql'):
+        matches = _scan(words)
+        facets = dict(matches.values_list('category').annotate(n=Count('id')).order_by())
+        if category:
+            matches = matches.filter(category=category)
+        results = list(matches.order_by('-id')[offset:offset + per_page])
+        return {'results': results, 'facets': facets, 'total': sum(facets.values())}
+
+    where, rank, build = _match()
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT c.category, COUNT(*) FROM {where} GROUP BY c.category", [build(words)])
+        facets = dict(cursor.fetchall())
+    results = _ranked(words, category, per_page, offset)
+    return {'results': results, 'facets': facets, 'total': sum(facets.values())}
+
+
+def suggest(query, limit=10):
+    """Best few matches for search-as-you-type, in one query and without facets."""
+    words = terms(query)
+    if not words:
+        return []
+    if connection.vendor not in ('sqlite', 'postgresql'):
+        return list(_scan(words).order_by('-id')[:limit])
+    return _ranked(words, None, limit, 0)
@@ -0,0 +1,113 @@
+import logging
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connections, transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.dispatch import Signal, receiver
+
+from . import accounts, caching, counters, search, thumbnails
+from .models import Campaign, Donation, DonationDailyRollup, Organization, Profile
+
+logger = logging.getLogger(__name__)
+
+# Sent by ledger.record() and counters.py after they change collected_amount
+# or the donation counters with raw or queryset updates, which bypass
+# post_save. Provides campaign_ids, and categories when the sender knows them.
+campaign_totals_changed = Signal()
+
+
+@receiver(connection_created)
+def tune_sqlite_connection(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for pragma, value in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+            cursor.execute(f'PRAGMA {pragma} = {value}')
+
+
+@receiver(post_migrate)
+def install_search_index(sender, app_config, using, **kwargs):
+    # Migrations are not tracked for this app, so the raw-SQL search index is set up here
+    if app_config.name == 'DonationsApp':
+        search.install(connections[using])
+
+
+@receiver(post_save, sender=Campaign)
+def campaign_saved(sender, instance, created, **kwargs):
+    if not created:
+        # Keep the denormalised category on the rollups in step with the campaign
+        DonationDailyRollup.objects.filter(campaign=instance).exclude(category=instance.category).update(
+            category=instance.category
+        )
+    # An edit may have moved the campaign between categories, so drop them all
+    transaction.on_commit(caching.invalidate_categories)
+
+
+@receiver(post_delete, sender=Campaign)
+def campaign_deleted(sender, instance, **kwargs):
+    transaction.on_commit(caching.invalidate_categories)
+
+
+@receiver(campaign_totals_changed)
+def campaign_totals_updated(sender, campaign_ids, categories=None, **kwargs):
+    if categories is None:
+        categories = set(Campaign.objects.filter(pk__in=campaign_ids).values_list('category', flat=True))
+    transaction.on_commit(lambda: caching.invalidate_categories(categories))
+
+
+@receiver(post_save, sender=Donation)
+def donation_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.created([instance])
+    if instance.user_id:
+        transaction.on_commit(lambda: caching.invalidate_user_donations([instance.user_id]))
+    # New pending donations are not listed; any edit may be (admin, shell)
+    if not created or instance.is_approved:
+        transaction.on_commit(caching.invalidate_approved)
+
+
+@receiver(post_delete, sender=Donation)
+def donation_deleted(sender, instance, **kwargs):
+    counters.deleted(instance)
+    if instance.user_id:
+        transaction.on_commit(lambda: caching.invalidate_user_donations([instance.user_id]))
+    if instance.is_approved:
+        transaction.on_commit(caching.invalidate_approved)
+
+
+@receiver(post_save, sender=Organization)
+def organization_saved(sender, instance, **kwargs):
+    # A no-op unless the image changed since the variants were built
+    try:
+        thumbnails.ensure_variants(instance)
+    except Exception:
+        # Missing file, not a decodable image, a decompression bomb, out of
+        # memory...: the row is already saved, so don't fail the request. The
+        # cards fall back to the original and saving again doesn't retry it
+        logger.exception("No image variants for organization %s (%s)", instance.pk, instance.image.name)
+        thumbnails.clear_variants(instance)
+    transaction.on_commit(caching.invalidate_organizations)
+
+
+@receiver(post_delete, sender=Organization)
+def organization_deleted(sender, instance, **kwargs):
+    transaction.on_commit(caching.invalidate_organizations)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    # Dropped now so this process never serves the old row (test databases
+    # even reuse ids), and again on commit in case another request re-cached
+    # it from the database before the write became visible
+    accounts.invalidate_user(instance.pk)
+    transaction.on_commit(lambda: accounts.invalidate_user(instance.pk))
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def profile_changed(sender, instance, **kwargs):
+    accounts.invalidate_profile(instance.user_id)
+    transaction.on_commit(lambda: accounts.invalidate_profile(instance.user_id))
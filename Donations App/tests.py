@@ -1,3 +1,1359 @@
-from django.test import TestCase
+import asyncio
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import threading
+from decimal import Decimal
+from io import BytesIO, StringIO
+from importlib.util import find_spec
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth import BACKEND_SESSION_KEY
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.db.models import ProtectedError
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from . import accounts, approvals, archive, counters, documents, exports, imports, ledger, outbox, pagination, progress, rollups, search, views
+from .models import (
+    ArchivedDonation, Campaign, CampaignContribution, ContactQuery, Donation, DonationDailyRollup, Organization, OutboxEmail,
+    Profile, RecipientRequest,
+)
+from .querybudget import QueryBudgetExceeded
+
+
+def run_in_threads(target, args_list):
+    """Start one thread per args tuple, release them together and collect errors."""
+    barrier = threading.Barrier(len(args_list))
+    errors = []
+
+    def worker(*args):
+        try:
+            barrier.wait()
+            target(*args)
+        except Exception as exc:  # pragma: no cover - surfaced by the assertion below
+            errors.append(exc)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=worker, args=args) for args in args_list]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return errors
+
+
+class LedgerConcurrencyTests(TransactionTestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user('admin', password='x', is_staff=True)
+        self.campaign = Campaign.objects.create(
+            title='Hot campaign', description='-', goal_amount=1000000, created_by=self.admin,
+        )
+
+    def make_donations(self, n, amount='10.00'):
+        return [
+            Donation.objects.create(campaign=self.campaign, amount=Decimal(amount))
+            for _ in range(n)
+        ]
+
+    def test_parallel_approvals_do_not_lose_updates(self):
+        donations = self.make_donations(40)
+        errors = run_in_threads(approvals.approve_donation, [(d.id,) for d in donations])
+
+        self.assertEqual(errors, [])
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.collected_amount, Decimal('400.00'))
+        self.assertEqual(CampaignContribution.objects.count(), 40)
+
+    def test_same_donation_approved_concurrently_is_credited_once(self):
+        donation, = self.make_donations(1, amount='25.00')
+        errors = run_in_threads(approvals.approve_donation, [(donation.id,)] * 10)
+
+        self.assertEqual(errors, [])
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.collected_amount, Decimal('25.00'))
+        self.assertEqual(CampaignContribution.objects.count(), 1)
+
+    def test_reject_after_approve_reverses_credit_and_rebuild_matches(self):
+        first, second = self.make_donations(2)
+        approvals.approve_donation(first.id)
+        approvals.approve_donation(second.id)
+        approvals.reject_donation(second.id)
+
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.collected_amount, Decimal('10.00'))
+
+        Campaign.objects.update(collected_amount=0)
+        ledger.rebuild_totals()
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.collected_amount, Decimal('10.00'))
+
+
+class OutboxTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user('admin', password='x', is_staff=True)
+        self.campaign = Campaign.objects.create(
+            title='Books', description='-', goal_amount=100, created_by=self.admin,
+        )
+        self.donation = Donation.objects.create(campaign=self.campaign, amount=5, email='d@example.com')
+        self.client.force_login(self.admin)
+
+    def test_approval_queues_mail_instead_of_sending(self):
+        self.client.get(reverse('approve_donation', args=[self.donation.id]))
+
+        self.assertEqual(mail.outbox, [])
+        queued = OutboxEmail.objects.get()
+        self.assertEqual(queued.recipients, 'd@example.com')
+
+        self.assertEqual(outbox.drain(), 1)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['d@example.com'])
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, 'sent')
+
+    def test_failed_delivery_is_retried_with_backoff_then_given_up(self):
+        outbox.queue_mail('Hi', 'Body', None, ['x@example.com'])
+        with mock.patch.object(mail.EmailMessage, 'send', side_effect=OSError('smtp down')):
+            outbox.drain(max_attempts=2)
+            queued = OutboxEmail.objects.get()
+            self.assertEqual((queued.status, queued.attempts), ('pending', 1))
+            self.assertGreater(queued.next_attempt_at, queued.created_at)
+
+            # Not due yet, so a second drain leaves it alone
+            self.assertEqual(outbox.drain(max_attempts=2), 0)
+            OutboxEmail.objects.update(next_attempt_at=queued.created_at)
+            outbox.drain(max_attempts=2)
+
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.attempts), ('failed', 2))
+        self.assertEqual(mail.outbox, [])
+
+    def test_overlapping_drains_send_each_message_once(self):
+        for n in range(3):
+            outbox.queue_mail(f'Hi {n}', 'Body', None, ['x@example.com'])
+        overlapping = []
+        send = mail.EmailMessage.send
+
+        def send_while_another_drain_runs(message, *args, **kwargs):
+            # A second send_outbox run starts while the first is mid-batch
+            if not overlapping:
+                overlapping.append(outbox.drain())
+            return send(message, *args, **kwargs)
+
+        with mock.patch.object(mail.EmailMessage, 'send', send_while_another_drain_runs):
+            self.assertEqual(outbox.drain(), 3)
+        self.assertEqual(overlapping, [0])
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(set(OutboxEmail.objects.values_list('status', flat=True)), {'sent'})
+
+    def test_batch_claimed_by_a_dead_worker_is_retried_after_the_timeout(self):
+        queued = outbox.queue_mail('Hi', 'Body', None, ['x@example.com'])
+        self.assertEqual(len(outbox.claim(10, timezone.now())), 1)
+        self.assertEqual(outbox.drain(), 0)
+        OutboxEmail.objects.update(next_attempt_at=timezone.now() - outbox.CLAIM_TIMEOUT)
+        self.assertEqual(outbox.drain(), 1)
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.claimed_by), ('sent', ''))
+
+
+class BulkApprovalTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user('admin', password='x', is_staff=True)
+        self.campaigns = [
+            Campaign.objects.create(title=f'C{i}', description='-', goal_amount=10**6, created_by=self.admin)
+            for i in range(3)
+        ]
+        Donation.objects.bulk_create(
+            Donation(campaign=self.campaigns[i % 3], amount=Decimal('2.50')) for i in range(1200)
+        )
+        self.client.force_login(self.admin)
+
+    def test_bulk_approve_aggregates_per_campaign_and_queues_once(self):
+        ids = list(Donation.objects.values_list('id', flat=True))
+        with CaptureQueriesContext(connection) as queries:
+            approved = approvals.approve_donations(ids)
+        # Chunked reads/flips and batched inserts, not a few queries per row
+        self.assertLess(len(queries), 60)
+        # One increment per campaign, sent as a single executemany()
+        updates = [q['sql'] for q in queries if 'UPDATE "DonationsApp_campaign" SET "collected_amount"' in q['sql']]
+        self.assertEqual([sql.split(' times: ')[0] for sql in updates], ['3'])
+
+        self.assertEqual(len(approved), 1200)
+        self.assertFalse(Donation.objects.filter(is_approved=False).exists())
+        for campaign in Campaign.objects.all():
+            self.assertEqual(campaign.collected_amount, Decimal('1000.00'))
+        self.assertEqual(OutboxEmail.objects.count(), 1200)
+
+        # Re-approving is a no-op
+        self.assertEqual(approvals.approve_donations(ids), [])
+
+    def test_panel_bulk_reject_reverses_approved_rows(self):
+        first, second = Donation.objects.filter(campaign=self.campaigns[0])[:2]
+        approvals.approve_donation(first.id)
+        self.client.post(reverse('bulk_settle_donations'), {
+            'action': 'reject', 'donation_ids': [first.id, second.id],
+        })
+
+        self.campaigns[0].refresh_from_db()
+        self.assertEqual(self.campaigns[0].collected_amount, Decimal('0.00'))
+        self.assertEqual(Donation.objects.filter(is_rejected=True).count(), 2)
+
+
+class CursorPaginationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('donor', password='x')
+        campaign = Campaign.objects.create(title='C', description='-', goal_amount=100, created_by=self.user)
+        Donation.objects.bulk_create(Donation(campaign=campaign, user=self.user) for _ in range(120))
+        # Identical timestamps force the id tie-breaker to do the work
+        Donation.objects.update(donated_at=timezone.now())
+        self.client.force_login(self.user)
+
+    def collect(self, response):
+        return [d.id for d in response.context['donations']]
+
+    def test_walks_forward_and_back_without_gaps_or_repeats(self):
+        url = reverse('my_donations')
+        response = self.client.get(url)
+        pages = [self.collect(response)]
+        while response.context['page'].has_next:
+            response = self.client.get(url, {'after': response.context['page'].next_cursor})
+            pages.append(self.collect(response))
+
+        seen = [pk for page in pages for pk in page]
+        expected = list(Donation.objects.order_by('-id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+        self.assertEqual([len(p) for p in pages], [50, 50, 20])
+
+        back = self.client.get(url, {'before': response.context['page'].prev_cursor})
+        self.assertEqual(self.collect(back), pages[1])
+
+    def test_bad_cursor_falls_back_to_first_page(self):
+        response = self.client.get(reverse('my_donations'), {'after': 'not-a-cursor'})
+        self.assertEqual(len(response.context['donations']), 50)
+
+
+class QueryPlanTests(TestCase):
+    """Every listing query must be served by an index, never a full table scan."""
+
+    def setUp(self):
+        self.admin = User.objects.create_user('admin', password='x', is_staff=True)
+        campaign = Campaign.objects.create(title='C', description='-', goal_amount=100, created_by=self.admin)
+        Donation.objects.create(campaign=campaign, user=self.admin)
+        ContactQuery.objects.create(user=self.admin, name='a', email='a@example.com', subject='s', message='m')
+        RecipientRequest.objects.create(user=self.admin, description='-')
+        self.client.force_login(self.admin)
+
+    def plans(self, url_name, params=None):
+        """(plan step, SQL) for every app-table SELECT the view runs."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse(url_name), params or {})
+        self.assertEqual(response.status_code, 200)
+        steps = []
+        with connection.cursor() as cursor:
+            for query in queries:
+                if not query['sql'].startswith('SELECT') or '"DonationsApp_' not in query['sql']:
+                    continue
+                cursor.execute('EXPLAIN QUERY PLAN ' + query['sql'])
+                steps += [(row[-1], query['sql']) for row in cursor.fetchall()]
+        return steps
+
+    def full_scans(self, url_name, params=None):
+        return [
+            (detail, sql) for detail, sql in self.plans(url_name, params)
+            if detail.startswith('SCAN') and 'INDEX' not in detail
+        ]
+
+    @skipUnless(connection.vendor == 'sqlite', "EXPLAIN QUERY PLAN is SQLite syntax")
+    def test_listing_views_use_indexes(self):
+        cursor = pagination.encode_cursor(timezone.now(), 10**9)
+        for url_name in ['approved_list', 'admin_approval_panel', 'view_queries', 'admin_recipient_requests',
+                         'my_donations', 'all_donations', 'my_request_status', 'education']:
+            for params in ({}, {'after': cursor}, {'before': cursor}):
+                with self.subTest(url_name, **params):
+                    self.assertEqual(self.full_scans(url_name, params), [])
+
+    @skipUnless(connection.vendor == 'sqlite', "EXPLAIN QUERY PLAN is SQLite syntax")
+    def test_status_listings_use_their_partial_indexes(self):
+        # Not donation_date_idx plus a filter on the status columns
+        cursor = pagination.encode_cursor(timezone.now(), 10**9)
+        for url_name, indexes in [
+            ('admin_approval_panel', ['donation_pending_idx']),
+            ('approved_list', ['donation_approved_idx', 'archive_approved_idx']),
+        ]:
+            for params in ({}, {'after': cursor}, {'before': cursor}):
+                with self.subTest(url_name, **params):
+                    details = ' '.join(detail for detail, _ in self.plans(url_name, params))
+                    for index in indexes:
+                        self.assertRegex(details, rf'INDEX {index}\b')
+
+
+class CategoryCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user('admin', password='x', is_staff=True)
+        self.campaign = Campaign.objects.create(
+            title='School books', description='-', goal_amount=100, created_by=self.admin, category='education',
+        )
+        self.client.force_login(self.admin)
+
+    def app_queries(self, url_name):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse(url_name))
+        return response, [q for q in queries if '"DonationsApp_' in q['sql']]
+
+    def test_warm_hit_runs_no_campaign_queries(self):
+        self.client.get(reverse('education'))
+        response, queries = self.app_queries('education')
+        self.assertContains(response, 'School books')
+        self.assertEqual(queries, [])
+
+    def test_edit_and_approval_invalidate(self):
+        self.client.get(reverse('education'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.campaign.title = 'Library books'
+            self.campaign.save()
+        self.assertContains(self.client.get(reverse('education')), 'Library books')
+
+        donation = Donation.objects.create(campaign=self.campaign, amount=7)
+        with self.captureOnCommitCallbacks(execute=True):
+            approvals.approve_donation(donation.id)
+        self.assertContains(self.client.get(reverse('education')), '₹7.00')
+
+    def test_unknown_category_is_404(self):
+        response = self.client.get(reverse('category', args=['toys']))
+        self.assertEqual(response.status_code, 404)
+
+
+class OrganizationCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('donor', password='x')
+        Profile.objects.create(user=self.user, role='donor', phone='1', address='-')
+        Organization.objects.create(name='Akshaya Patra', website_url='https://example.org', category='food')
+        self.client.force_login(self.user)
+
+    def test_warm_dashboard_skips_organization_query_until_org_changes(self):
+        self.client.get(reverse('dashboard'))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('dashboard'))
+        self.assertContains(response, 'Akshaya Patra')
+        self.assertFalse([q for q in queries if 'DonationsApp_organization' in q['sql']])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Organization.objects.create(name='ISKCON', website_url='https://example.org', category='temple')
+        self.assertContains(self.client.get(reverse('dashboard')), 'ISKCON')
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class ThumbnailTests(TestCase):
+    def upload(self, name, color):
+        data = BytesIO()
+        Image.new('RGBA', (1200, 600), color).save(data, 'PNG')
+        return SimpleUploadedFile(name, data.getvalue(), content_type='image/png')
+
+    def test_upload_builds_small_deduplicated_variants(self):
+        first = Organization.objects.create(
+            name='TTD', website_url='https://example.org', image=self.upload('TTD.png', 'red'),
+        )
+        self.assertEqual(set(first.image_variants['webp']), {'1x', '2x'})
+        with first.image.storage.open(first.image_variants['jpeg']['2x']) as f:
+            self.assertEqual(Image.open(f).size, (400, 200))
+        self.assertIn(' 2x', first.webp_srcset)
+
+        # Same bytes under another name: the variants are shared, not rewritten
+        second = Organization.objects.create(
+            name='TTD again', website_url='https://example.org', image=self.upload('TTD.png', 'red'),
+        )
+        self.assertNotEqual(first.image.name, second.image.name)
+        self.assertEqual(first.image_variants['webp'], second.image_variants['webp'])
+
+    def test_unreadable_image_does_not_break_saving_the_organization(self):
+        org = Organization.objects.create(
+            name='TTD', website_url='https://example.org', image=self.upload('TTD.png', 'red'),
+        )
+        storage = org.image.storage
+        broken = storage.save('organization_images/broken.png', SimpleUploadedFile('broken.png', b'not a png'))
+        for name in (storage.get_available_name('organization_images/missing.png'), broken):
+            with self.subTest(name), self.assertLogs('DonationsApp.signals', 'WARNING'):
+                org.image = name
+                org.name = 'TTD temple'
+                org.save()
+            self.assertEqual(Organization.objects.get().image_variants, {'source': name})
+            self.assertEqual(org.thumbnail_url, storage.url(name))
+        storage.delete(broken)
+
+        # Pillow's size guard is not an OSError
+        with mock.patch('DonationsApp.thumbnails.build_variants', side_effect=Image.DecompressionBombError('big')), \
+                self.assertLogs('DonationsApp.signals', 'ERROR'):
+            org.image = 'organization_images/huge.png'
+            org.save()
+        self.assertEqual(Organization.objects.get().image_variants, {'source': 'organization_images/huge.png'})
+
+        # Unrelated edits don't retry the build
+        with mock.patch('DonationsApp.thumbnails.build_variants') as build:
+            org.website_url = 'https://example.com'
+            org.save()
+        build.assert_not_called()
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user('admin', password='x', is_staff=True)
+        campaign = Campaign.objects.create(title='Meals', description='-', goal_amount=100, created_by=self.admin)
+        Donation.objects.create(campaign=campaign, user=self.admin, amount=5, is_approved=True)
+        Donation.objects.create(campaign=campaign, amount=9)
+        self.client.force_login(self.admin)
+
+    def test_streams_filtered_csv_and_ndjson(self):
+        response = self.client.get(reverse('export_donations'), {'format': 'csv', 'status': 'approved'})
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(',')[:3], ['id', 'donated_at', 'status'])
+        self.assertEqual(len(lines), 2)
+        self.assertIn('approved', lines[1])
+        self.assertIn('Meals', lines[1])
+
+        response = self.client.get(reverse('export_donations'), {'format': 'ndjson'})
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([r['status'] for r in rows], ['approved', 'pending'])
+        self.assertEqual(rows[0]['user_username'], 'admin')
+
+    def test_bad_filters_are_rejected(self):
+        response = self.client.get(reverse('export_donations'), {'start': '2024-13-01'})
+        self.assertEqual(response.status_code, 400)
+
+
+class RollupTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user('admin', password='x', is_staff=True)
+        self.campaign = Campaign.objects.create(
+            title='Blankets', description='-', goal_amount=100, created_by=self.admin, category='clothes',
+        )
+        self.money = Donation.objects.create(campaign=self.campaign, amount=40)
+        self.goods = Donation.objects.create(campaign=self.campaign, amount=15, donation_type='goods')
+        self.client.force_login(self.admin)
+
+    def test_incremental_rollups_match_rebuild_and_feed_the_report(self):
+        approvals.approve_donations([self.money.id, self.goods.id])
+        approvals.reject_donation(self.goods.id)
+
+        rollup = DonationDailyRollup.objects.get()
+        self.assertEqual((rollup.money_count, rollup.money_amount), (1, Decimal('40.00')))
+        self.assertEqual((rollup.goods_count, rollup.goods_amount), (0, Decimal('0.00')))
+
+        incremental = list(DonationDailyRollup.objects.values('day', 'campaign', *rollups.COUNTERS))
+        rollups.rebuild()
+        self.assertEqual(list(DonationDailyRollup.objects.values('day', 'campaign', *rollups.COUNTERS)), incremental)
+
+        # The report only reads the rollup table (plus campaign titles)
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get(reverse('statistics_data')).json()
+        self.assertFalse([q for q in queries if 'DonationsApp_donation"' in q['sql']])
+        self.assertEqual(data['by_category'][0]['category'], 'clothes')
+        self.assertEqual(Decimal(data['by_category'][0]['approved_amount']), Decimal('40'))
+
+    def test_statistics_and_category_pages_render(self):
+        # Both HTML pages, not just the JSON and cached paths
+        approvals.approve_donation(self.money.id)
+        response = self.client.get(reverse('statistics'), {'days': 7})
+        self.assertContains(response, 'Blankets')
+        self.assertContains(response, '<option value="7" selected>7 days</option>', html=True)
+        cache.clear()
+        self.assertContains(self.client.get(reverse('category', args=['clothes'])), 'Blankets')
+
+
+@override_settings(QUERY_BUDGET_STRICT=True)
+class QueryBudgetTests(TestCase):
+    """Listing views must run the same number of queries whatever the row count."""
+
+    LISTINGS = ['my_donations', 'all_donations', 'approved_list', 'view_queries', 'admin_approval_panel',
+                'admin_recipient_requests', 'my_request_status', 'education', 'dashboard', 'statistics']
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user('admin', password='x', is_staff=True)
+        Profile.objects.create(user=self.admin, role='admin', phone='1', address='-')
+        self.client.force_login(self.admin)
+
+    def seed(self, n):
+        for i in range(n):
+            user = User.objects.create_user(f'user{n}-{i}', password='x')
+            campaign = Campaign.objects.create(title='C', description='-', goal_amount=1, created_by=user)
+            Donation.objects.create(campaign=campaign, user=self.admin, amount=1)
+            Donation.objects.create(campaign=campaign, user=user, amount=1, is_approved=True)
+            ContactQuery.objects.create(user=user, name='n', email='e@example.com', subject='s', message='m')
+            RecipientRequest.objects.create(user=user if i % 2 else self.admin, description='-')
+            Organization.objects.create(name='Org', website_url='https://example.org')
+
+    def query_counts(self):
+        counts = {}
+        for url_name in self.LISTINGS:
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.client.get(reverse(url_name)).status_code, 200)
+            counts[url_name] = len(queries)
+        return counts
+
+    def test_listing_views_stay_within_budget_and_constant(self):
+        self.seed(2)
+        few = self.query_counts()
+        self.seed(25)
+        self.assertEqual(self.query_counts(), few)
+
+    def test_over_budget_view_fails_loudly(self):
+        with mock.patch.object(views.my_donations_view, 'query_budget', 1):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get(reverse('my_donations'))
+
+    @override_settings(QUERY_BUDGET_STRICT=False, DEBUG=False)
+    def test_production_logs_over_budget_views_without_exposing_counts(self):
+        with mock.patch.object(views.my_donations_view, 'query_budget', 1), \
+                self.assertLogs('DonationsApp.querybudget', 'WARNING'):
+            response = self.client.get(reverse('my_donations'))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('Server-Timing'))
+
+
+class AsyncViewTests(TestCase):
+    """The async listing and donate views, driven through the ASGI handler."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('donor', password='x', email='donor@example.com')
+        Profile.objects.create(user=self.user, role='donor', phone='98765', address='-')
+        self.campaign = Campaign.objects.create(
+            title='Books', description='Textbooks', goal_amount=100, created_by=self.user, category='education',
+        )
+        Donation.objects.create(campaign=self.campaign, user=self.user, amount=5, is_approved=True)
+        self.async_client.force_login(self.user)
+
+    @override_settings(QUERY_BUDGET_STRICT=True)
+    async def test_listings_render_under_asgi(self):
+        for url_name in ['my_donations', 'approved_list', 'education']:
+            response = await self.async_client.get(reverse(url_name))
+            self.assertEqual(response.status_code, 200, url_name)
+            # Queries run on the request's sync thread must still be counted
+            self.assertRegex(response['Server-Timing'], r'desc="[1-9]\d* queries"')
+
+    async def test_donate_get_prefills_from_profile(self):
+        response = await self.async_client.get(reverse('donate', args=[self.campaign.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['form'].initial['phone'], '98765')
+        self.assertEqual(response.context['form'].initial['purpose'], 'Textbooks')
+
+    async def test_donate_post_saves_for_the_user(self):
+        response = await self.async_client.post(reverse('donate', args=[self.campaign.pk]), {
+            'donation_type': 'money', 'name': 'Donor', 'phone': '98765', 'email': 'donor@example.com',
+            'campaign': self.campaign.pk, 'purpose': 'Books', 'amount': '25.00',
+        })
+        self.assertEqual(response.status_code, 200)
+        donation = await Donation.objects.filter(amount=Decimal('25.00')).afirst()
+        self.assertEqual(donation.user_id, self.user.pk)
+        self.assertFalse(donation.is_approved)
+
+    async def test_unknown_campaign_is_404(self):
+        response = await self.async_client.get(reverse('donate', args=[self.campaign.pk + 100]))
+        self.assertEqual(response.status_code, 404)
+
+    async def test_anonymous_and_non_staff_are_redirected(self):
+        await sync_to_async(self.async_client.logout)()
+        response = await self.async_client.get(reverse('my_donations'))
+        self.assertEqual(response.status_code, 302)
+        await sync_to_async(self.async_client.force_login)(self.user)
+        response = await self.async_client.get(reverse('all_donations'))
+        self.assertEqual(response.status_code, 302)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), DOCUMENT_MAX_UPLOAD_SIZE=64 * 1024)
+class RecipientDocumentTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('recipient', password='x')
+        self.client.force_login(self.user)
+
+    def submit(self, url_name, aadhaar=b'scan-bytes', ration=b'card-bytes'):
+        return self.client.post(reverse(url_name), {
+            'aadhaar_number': '123412341234', 'ration_card_number': 'RC1', 'family_income': '1000',
+            'description': 'Need help',
+            'aadhaar_file': SimpleUploadedFile('Aadhaar Front.PDF', aadhaar, content_type='application/pdf'),
+            'ration_card_file': SimpleUploadedFile('card.jpg', ration, content_type='image/jpeg'),
+        })
+
+    def test_uploads_are_content_addressed_and_deduplicated(self):
+        for url_name in ('recipient_request_form', 'request_assistance'):
+            self.assertEqual(self.submit(url_name).status_code, 302)
+        first, second = RecipientRequest.objects.order_by('id')
+        digest = hashlib.sha256(b'scan-bytes').hexdigest()
+        self.assertEqual(first.aadhaar_file.name, f'documents/{digest[:2]}/{digest[2:4]}/{digest}.pdf')
+        # The resubmitted scan points at the file already stored
+        self.assertEqual(first.aadhaar_file.name, second.aadhaar_file.name)
+        self.assertEqual(len(os.listdir(os.path.dirname(first.aadhaar_file.path))), 1)
+        with first.ration_card_file.open('rb') as f:
+            self.assertEqual(f.read(), b'card-bytes')
+
+    def test_oversized_upload_is_rejected_without_saving(self):
+        response = self.submit('recipient_request_form', aadhaar=b'x' * (65 * 1024))
+        self.assertEqual(response.status_code, 413)
+        self.assertFalse(RecipientRequest.objects.exists())
+
+    def test_documents_are_served_to_owner_and_staff_only(self):
+        self.submit('recipient_request_form')
+        recipient_request = RecipientRequest.objects.get()
+        url = reverse('recipient_document', args=[recipient_request.pk, 'aadhaar_file'])
+
+        response = self.client.get(url)
+        self.assertEqual(b''.join(response.streaming_content), b'scan-bytes')
+        with self.settings(DOCUMENT_SENDFILE_HEADER='X-Accel-Redirect'):
+            response = self.client.get(url)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected/' + recipient_request.aadhaar_file.name)
+        self.assertEqual(response.content, b'')
+
+        self.client.force_login(User.objects.create_user('someone-else', password='x'))
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.client.force_login(User.objects.create_user('staff', password='x', is_staff=True))
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_only_pdf_and_image_scans_are_accepted_or_shown_inline(self):
+        response = self.client.post(reverse('recipient_request_form'), {
+            'aadhaar_number': '123412341234', 'ration_card_number': 'RC1', 'family_income': '1000',
+            'description': 'Need help',
+            'aadhaar_file': SimpleUploadedFile('scan.html', b'<script>alert(1)</script>', content_type='text/html'),
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('aadhaar_file', response.context['form'].errors)
+        self.assertFalse(RecipientRequest.objects.exists())
+
+        self.submit('recipient_request_form')
+        response = self.client.get(reverse('recipient_document', args=[RecipientRequest.objects.get().pk, 'aadhaar_file']))
+        self.assertEqual((response['Content-Type'], response['X-Content-Type-Options']), ('application/pdf', 'nosniff'))
+        self.assertTrue(response['Content-Disposition'].startswith('inline;'))
+
+        # Stored before uploads were restricted: downloaded, never rendered
+        legacy = RecipientRequest.objects.create(
+            user=self.user, description='-',
+            aadhaar_file=documents.storage.save('scan.svg', SimpleUploadedFile('scan.svg', b'<svg onload="alert(1)"/>')),
+        )
+        self.client.force_login(User.objects.create_user('staff', password='x', is_staff=True))
+        response = self.client.get(reverse('recipient_document', args=[legacy.pk, 'aadhaar_file']))
+        self.assertEqual(response['Content-Type'], 'application/octet-stream')
+        self.assertTrue(response['Content-Disposition'].startswith('attachment;'))
+        self.assertEqual(response['X-Content-Type-Options'], 'nosniff')
+
+
+class CampaignSearchTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('donor', password='x')
+        self.client.force_login(self.user)
+
+    def campaign(self, title, description='-', category='education'):
+        return Campaign.objects.create(
+            title=title, description=description, goal_amount=1, created_by=self.user, category=category,
+        )
+
+    def test_ranked_prefix_matches_with_category_facets(self):
+        in_title = self.campaign('School books for girls')
+        in_description = self.campaign('Rural drive', description='Buying books for a school', category='infrastructure')
+        self.campaign('Winter blankets', category='clothes')
+
+        found = search.search('book')
+        self.assertEqual([c.pk for c in found['results']], [in_title.pk, in_description.pk])
+        self.assertEqual(found['facets'], {'education': 1, 'infrastructure': 1})
+
+        found = search.search('books', category='infrastructure')
+        self.assertEqual([c.pk for c in found['results']], [in_description.pk])
+        self.assertEqual(found['total'], 2)
+
+    def test_index_follows_edits_and_deletes(self):
+        campaign = self.campaign('Clean water')
+        Campaign.objects.filter(pk=campaign.pk).update(title='Safe drinking water wells')
+        self.assertEqual(search.search('clean')['total'], 0)
+        self.assertEqual(search.search('wells')['total'], 1)
+        campaign.delete()
+        self.assertEqual(search.search('wells')['total'], 0)
+
+    def test_operator_syntax_is_treated_as_words(self):
+        self.campaign('Food "for" all')
+        self.assertEqual(search.search('food OR -* "')['total'], 0)
+        self.assertEqual(search.search('"food" (all')['total'], 1)
+        self.assertEqual(search.search('  ')['total'], 0)
+
+    def test_search_page(self):
+        self.campaign('Medicine for the elderly', category='medical')
+        response = self.client.get(reverse('search_campaigns'), {'q': 'medicine'})
+        self.assertContains(response, 'Medicine for the elderly')
+        self.assertContains(response, 'Medical (1)')
+
+
+class DonationFormTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('donor', password='x', email='donor@example.com')
+        self.campaign = Campaign.objects.create(title='Books', description='-', goal_amount=1, created_by=self.user)
+        self.client.force_login(self.user)
+
+    def donate(self, campaign_id, **data):
+        return self.client.post(reverse('donate', args=[self.campaign.pk]), dict({
+            'donation_type': 'money', 'name': 'Donor', 'phone': '1', 'email': 'donor@example.com',
+            'campaign': campaign_id, 'purpose': 'Books', 'amount': '10',
+        }, **data))
+
+    def test_page_cost_does_not_grow_with_campaigns(self):
+        url = reverse('donate', args=[self.campaign.pk])
+        self.client.get(url)  # warm the session/user/profile caches
+        with CaptureQueriesContext(connection) as few:
+            response = self.client.get(url)
+        self.assertNotContains(response, '<select name="campaign"')
+        self.assertContains(response, f'name="campaign" value="{self.campaign.pk}"')
+        Campaign.objects.bulk_create(
+            Campaign(title=f'C{i}', description='-', goal_amount=1, created_by=self.user) for i in range(50)
+        )
+        with CaptureQueriesContext(connection) as many:
+            self.client.get(url)
+        self.assertEqual(len(few), len(many))
+
+    def test_url_campaign_is_not_fetched_again_on_post(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.donate(self.campaign.pk)
+        campaign_reads = [q for q in queries if 'FROM "DonationsApp_campaign"' in q['sql']]
+        self.assertEqual(len(campaign_reads), 1)
+        self.assertEqual(Donation.objects.get().campaign, self.campaign)
+
+    def test_picking_another_campaign(self):
+        other = Campaign.objects.create(title='Blankets for winter', description='-', goal_amount=1, created_by=self.user)
+        suggested = self.client.get(reverse('campaign_suggest'), {'q': 'blank'}).json()['results']
+        self.assertEqual(suggested, [{'id': other.pk, 'title': other.title, 'category': 'education'}])
+
+        self.donate(other.pk)
+        self.assertEqual(Donation.objects.get().campaign, other)
+        self.assertEqual(self.donate(other.pk + 100).status_code, 200)  # re-rendered with an error
+        self.assertEqual(Donation.objects.count(), 1)
+
+
+class CachedAccountTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('donor', password='x')
+        Profile.objects.create(user=self.user, role='donor', phone='111', address='-')
+        self.client.force_login(self.user)
+
+    def test_warm_authenticated_pages_run_no_queries(self):
+        for url_name in ('dashboard', 'profile'):
+            self.client.get(reverse(url_name))
+            with self.assertNumQueries(0):
+                self.assertEqual(self.client.get(reverse(url_name)).status_code, 200)
+
+    def test_profile_edit_is_visible_on_the_next_request(self):
+        self.client.get(reverse('dashboard'))
+        response = self.client.post(reverse('edit_profile'), {
+            'role': 'recipient', 'gender': 'F', 'phone': '222', 'address': 'New St',
+        })
+        self.assertRedirects(response, reverse('profile'), fetch_redirect_response=False)
+        self.assertContains(self.client.get(reverse('dashboard')), '(Recipient)')
+        self.assertEqual(accounts.cached_profile(self.user).phone, '222')
+
+    def test_deactivated_or_changed_user_is_not_served_from_cache(self):
+        self.client.get(reverse('dashboard'))
+        self.user.set_password('changed')
+        self.user.save()
+        self.assertEqual(self.client.get(reverse('dashboard')).status_code, 302)
+
+    def test_sessions_from_the_plain_model_backend_stay_logged_in(self):
+        self.client.force_login(self.user, backend='django.contrib.auth.backends.ModelBackend')
+        self.assertEqual(self.client.get(reverse('dashboard')).status_code, 200)
+        self.assertFalse(self.client.login(username='donor', password='wrong'))
+        self.assertTrue(self.client.login(username='donor', password='x'))
+        self.assertEqual(self.client.session[BACKEND_SESSION_KEY], 'DonationsApp.accounts.CachedModelBackend')
+
+    @override_settings(AUTHENTICATION_BACKENDS=[
+        'DonationsApp.accounts.CachedModelBackend', 'django.contrib.auth.backends.AllowAllUsersModelBackend',
+    ])
+    def test_a_failed_login_falls_through_to_later_backends(self):
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertTrue(self.client.login(username='donor', password='x'))
+        self.assertEqual(
+            self.client.session[BACKEND_SESSION_KEY], 'django.contrib.auth.backends.AllowAllUsersModelBackend',
+        )
+
+    def test_cache_holds_no_password_and_saving_the_cached_user_keeps_it(self):
+        self.client.get(reverse('dashboard'))
+        self.assertNotIn(self.user.password.encode(), pickle.dumps(cache.get(accounts.user_key(self.user.pk))))
+
+        user = accounts.CachedModelBackend().get_user(self.user.pk)
+        user.first_name = 'Asha'
+        with self.assertNumQueries(1):
+            user.save()
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.first_name, 'Asha')
+        self.assertTrue(self.user.check_password('x'))
+        # A password check loads the deferred hash
+        self.assertTrue(accounts.CachedModelBackend().get_user(self.user.pk).check_password('x'))
+
+
+class TemplateFragmentTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.staff = User.objects.create_user('admin', password='x', is_staff=True)
+        Profile.objects.create(user=self.staff, role='admin', phone='1', address='-')
+        self.donor = User.objects.create_user('donor', password='x')
+        Profile.objects.create(user=self.donor, role='donor', phone='2', address='-')
+
+    def test_cached_navigation_is_kept_apart_per_role(self):
+        self.client.force_login(self.staff)
+        self.assertContains(self.client.get(reverse('dashboard')), reverse('admin_approval_panel'))
+        self.client.force_login(self.donor)
+        response = self.client.get(reverse('dashboard'))
+        self.assertNotContains(response, reverse('admin_approval_panel'))
+        self.assertContains(response, reverse('contact_admin'))
+        self.client.logout()
+        self.assertNotContains(self.client.get(reverse('login')), reverse('my_donations'))
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('donor', password='x')
+        Profile.objects.create(user=self.user, role='donor', phone='1', address='-')
+        self.campaign = Campaign.objects.create(
+            title='School books', description='-', goal_amount=100, created_by=self.user, category='education',
+        )
+        self.client.force_login(self.user)
+
+    def revalidate(self, url_name):
+        first = self.client.get(reverse(url_name))
+        return first, self.client.get(reverse(url_name), HTTP_IF_NONE_MATCH=first['ETag'])
+
+    def test_current_copy_gets_304_without_queries_or_rendering(self):
+        for url_name in ('education', 'approved_list'):
+            first = self.client.get(reverse(url_name))
+            self.assertEqual(first.status_code, 200)
+            self.assertTrue(first.has_header('Last-Modified'))
+            with self.assertNumQueries(0):
+                response = self.client.get(reverse(url_name), HTTP_IF_NONE_MATCH=first['ETag'])
+            self.assertEqual(response.status_code, 304, url_name)
+            self.assertEqual(response.templates, [])
+            response = self.client.get(reverse(url_name), HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+            self.assertEqual(response.status_code, 304, url_name)
+
+    def test_campaign_edit_changes_the_category_etag(self):
+        first, _ = self.revalidate('education')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.campaign.title = 'Library books'
+            self.campaign.save()
+        response = self.client.get(reverse('education'), HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertContains(response, 'Library books')
+        self.assertNotEqual(response['ETag'], first['ETag'])
+
+    def test_approval_changes_the_approved_list_etag(self):
+        donation = Donation.objects.create(campaign=self.campaign, name='Asha', amount=7)
+        first, second = self.revalidate('approved_list')
+        self.assertEqual(second.status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            approvals.approve_donation(donation.id)
+        response = self.client.get(reverse('approved_list'), HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertContains(response, 'Asha')
+
+    def test_staff_copy_is_not_validated_by_a_donor_etag(self):
+        first, _ = self.revalidate('education')
+        staff = User.objects.create_user('admin', password='x', is_staff=True)
+        self.client.force_login(staff)
+        response = self.client.get(reverse('education'), HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+
+
+class ProgressFeedTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('donor', password='x')
+        self.campaign = Campaign.objects.create(
+            title='School books', description='-', goal_amount=100, created_by=self.user, category='education',
+        )
+        self.client.force_login(self.user)
+
+    def test_ledger_changes_become_one_event_per_campaign(self):
+        tail = progress.ledger_tail()
+        for amount in (5, 7):
+            approvals.approve_donation(Donation.objects.create(campaign=self.campaign, amount=amount).id)
+        last_id, items = progress.changes_since(tail)
+        self.assertEqual(last_id, progress.ledger_tail())
+        self.assertEqual(items, [('education', {
+            'campaign': self.campaign.pk, 'collected': '12.00', 'goal': '100.00', 'delta': '12.00',
+        })])
+        self.assertEqual(progress.changes_since(last_id), (last_id, []))
+
+    def test_polls_close_the_connections_they_open(self):
+        # The watcher polls from executor threads, outside any request
+        closed = []
+
+        def poll():
+            progress._poll(progress.ledger_tail)
+            closed.append(connection.connection is None)
+            connection.close()
+
+        with mock.patch.dict(connection.settings_dict, {'CONN_MAX_AGE': 0}):
+            thread = threading.Thread(target=poll)
+            thread.start()
+            thread.join()
+        self.assertEqual(closed, [True])
+
+    def test_without_asgi_the_url_tells_clients_not_to_reconnect(self):
+        self.assertEqual(self.client.get(reverse('campaign_progress')).status_code, 204)
+
+    async def stream(self, cookie, query=b'category=education', last_event_id=None):
+        """Run sse_app against a fresh broadcaster; returns (broadcaster, task, sent, receive queue)."""
+        broadcaster = progress.Broadcaster(history=2)
+        patcher = mock.patch.object(progress, 'broadcaster', broadcaster)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        received, sent = asyncio.Queue(), []
+        await received.put({'type': 'http.request', 'body': b''})
+        headers = [(b'cookie', cookie.encode())]
+        if last_event_id is not None:
+            headers.append((b'last-event-id', str(last_event_id).encode()))
+        scope = {'type': 'http', 'method': 'GET', 'path': progress.stream_path(), 'query_string': query,
+                 'headers': headers}
+
+        async def send(message):
+            sent.append(message)
+
+        task = asyncio.ensure_future(progress.sse_app(scope, received.get, send))
+        for _ in range(200):
+            if broadcaster.subscribers or task.done():
+                break
+            await asyncio.sleep(0.01)
+        return broadcaster, task, sent, received
+
+    async def test_stream_pushes_category_events_and_ends_on_disconnect(self):
+        cookie = f"sessionid={self.client.cookies['sessionid'].value}"
+        broadcaster, task, sent, received = await self.stream(cookie)
+        self.assertEqual(sent[0]['status'], 200)
+        broadcaster.publish([('food', {'campaign': 0}), ('education', {'campaign': self.campaign.pk})])
+        await asyncio.sleep(0.01)
+        body = b''.join(m.get('body', b'') for m in sent[1:])
+        self.assertIn(b'id: 2\nevent: progress\ndata: {"campaign":%d}' % self.campaign.pk, body)
+        self.assertNotIn(b'"campaign":0}', body)
+
+        await received.put({'type': 'http.disconnect'})
+        await asyncio.wait_for(task, 1)
+        self.assertEqual(broadcaster.subscribers, 0)
+        broadcaster.watcher.cancel()
+
+    async def test_resuming_past_the_history_asks_for_a_reload(self):
+        cookie = f"sessionid={self.client.cookies['sessionid'].value}"
+        broadcaster, task, sent, received = await self.stream(cookie, last_event_id=7)
+        await asyncio.sleep(0.01)
+        # Id 7 was never issued here (e.g. the server restarted)
+        self.assertIn(b'event: reload', b''.join(m.get('body', b'') for m in sent[1:]))
+        await received.put({'type': 'http.disconnect'})
+        await asyncio.wait_for(task, 1)
+        broadcaster.watcher.cancel()
+
+    async def test_anonymous_and_unknown_category_are_refused(self):
+        _, task, sent, _ = await self.stream('')
+        await task
+        self.assertEqual(sent[0]['status'], 403)
+        cookie = f"sessionid={self.client.cookies['sessionid'].value}"
+        _, task, sent, _ = await self.stream(cookie, query=b'category=toys')
+        await task
+        self.assertEqual(sent[0]['status'], 404)
+
+
+class ArchiveTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('donor', password='x')
+        self.campaign = Campaign.objects.create(
+            title='Meals', description='-', goal_amount=100, created_by=self.user, category='food',
+        )
+        old = timezone.now() - timezone.timedelta(days=400)
+        self.donations = {}
+        for name, amount, settle, age in [
+            ('old-approved', 10, approvals.approve_donation, old),
+            ('old-rejected', 20, approvals.reject_donation, old),
+            ('old-pending', 30, None, old),
+            ('new-approved', 40, approvals.approve_donation, None),
+        ]:
+            donation = Donation.objects.create(campaign=self.campaign, user=self.user, name=name, amount=amount)
+            if settle:
+                settle(donation.pk)
+            if age:
+                Donation.objects.filter(pk=donation.pk).update(donated_at=age - timezone.timedelta(minutes=amount))
+            self.donations[name] = donation.pk
+        self.client.force_login(self.user)
+
+    def test_moves_old_settled_donations_and_keeps_totals(self):
+        rollups.rebuild()  # setUp backdated donations after their approval was rolled up
+        rollups_before = list(DonationDailyRollup.objects.order_by('day').values('day', *rollups.COUNTERS))
+        self.assertEqual(archive.archive(days=365, batch_size=1), 2)
+        self.assertEqual(archive.archive(days=365), 0)
+
+        self.assertEqual(
+            set(ArchivedDonation.objects.values_list('pk', flat=True)),
+            {self.donations['old-approved'], self.donations['old-rejected']},
+        )
+        self.assertEqual(
+            set(Donation.objects.values_list('pk', flat=True)),
+            {self.donations['old-pending'], self.donations['new-approved']},
+        )
+        self.assertTrue(ArchivedDonation.objects.get(pk=self.donations['old-approved']).is_approved)
+
+        # Ledger rows stay, so the totals still add up from them
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.collected_amount, Decimal('50.00'))
+        ledger.rebuild_totals()
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.collected_amount, Decimal('50.00'))
+        rollups.rebuild()
+        self.assertEqual(list(DonationDailyRollup.objects.order_by('day').values('day', *rollups.COUNTERS)), rollups_before)
+
+    def test_a_batch_that_moves_nothing_does_not_end_the_run(self):
+        move = archive._move
+        calls = []
+
+        def first_batch_changed(ids, archived_at):
+            # As if the first row changed between candidates() and the move
+            calls.append(ids)
+            return 0 if len(calls) == 1 else move(ids, archived_at)
+
+        with mock.patch.object(archive, '_move', first_batch_changed):
+            self.assertEqual(archive.archive(days=365, batch_size=1), 1)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(list(ArchivedDonation.objects.values_list('pk', flat=True)), calls[1])
+
+    def test_listings_and_exports_read_hot_and_archived_rows(self):
+        archive.archive(days=365)
+        newest_first = ['new-approved', 'old-approved', 'old-rejected', 'old-pending']
+
+        response = self.client.get(reverse('my_donations'))
+        self.assertEqual([d.name for d in response.context['donations']], newest_first)
+        response = self.client.get(reverse('approved_list'))
+        self.assertEqual([d.name for d in response.context['donations']], ['new-approved', 'old-approved'])
+
+        # Cursor pages step across both tables, in both directions
+        factory, names, params = RequestFactory(), [], {}
+        while True:
+            page = pagination.paginate_across(factory.get('/', params), archive.querysets(), 'donated_at', per_page=1)
+            names += [d.name for d in page]
+            if not page.has_next:
+                break
+            params = {'after': page.next_cursor}
+        self.assertEqual(names, newest_first)
+        page = pagination.paginate_across(factory.get('/', {'before': page.prev_cursor}), archive.querysets(),
+                                          'donated_at', per_page=2)
+        self.assertEqual([d.name for d in page], ['old-approved', 'old-rejected'])
+
+        rows = list(exports.donation_rows())
+        self.assertEqual([row[0] for row in rows], [self.donations[n] for n in reversed(newest_first)])
+        self.assertEqual(len(list(exports.donation_rows(status='approved'))), 2)
+
+    def test_campaign_with_only_archived_donations_cannot_be_deleted(self):
+        archive.archive(days=0)
+        Donation.objects.filter(pk=self.donations['old-pending']).delete()
+        self.assertFalse(self.campaign.donation_set.exists())
+        history = ArchivedDonation.objects.count(), CampaignContribution.objects.count()
+
+        self.client.force_login(User.objects.create_user('admin', password='x', is_staff=True))
+        url = reverse('delete_campaign', args=[self.campaign.pk])
+        self.assertContains(self.client.get(url), 'cannot be deleted')
+        self.client.post(url)
+        self.assertTrue(Campaign.objects.filter(pk=self.campaign.pk).exists())
+        self.assertEqual((ArchivedDonation.objects.count(), CampaignContribution.objects.count()), history)
+        # The foreign keys hold even when the view's check is bypassed
+        with self.assertRaises(ProtectedError):
+            self.campaign.delete()
+
+
+class ImportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('admin', password='x', is_staff=True, is_superuser=True)
+        self.campaign = Campaign.objects.create(
+            title='Meals', description='-', goal_amount=100, created_by=self.user, category='food',
+        )
+
+    def sheet(self, *rows):
+        header = ['donation_type', 'name', 'phone', 'email', 'campaign', 'purpose', 'amount', 'address', 'donated_at']
+        lines = [','.join(header)] + [','.join(str(v) for v in row) for row in rows]
+        return BytesIO('\n'.join(lines).encode('utf-8-sig'))
+
+    def row(self, amount=10, donated_at='2024-03-01', **overrides):
+        row = dict(donation_type='money', name='Camp donor', phone='1', email='camp@example.com',
+                   campaign=self.campaign.pk, purpose='Meals', amount=amount, address='-', donated_at=donated_at)
+        row.update(overrides)
+        return list(row.values())
+
+    def test_imports_valid_rows_and_reports_the_rest(self):
+        f = self.sheet(
+            self.row(10),
+            self.row(5, donation_type='goods', donated_at=''),
+            self.row(email='not-an-email'),
+            self.row(campaign=self.campaign.pk + 100),
+            self.row(donated_at='01/03/2024'),
+            self.row(name=''),
+        )
+        report = imports.import_donations(imports.read_rows(f, 'camp.csv'), batch_size=2)
+
+        self.assertEqual((report.imported, report.failed), (2, 4))
+        self.assertEqual([line for line, _ in report.errors], [4, 5, 6, 7])
+        self.assertIn('email:', report.errors[0][1])
+        self.assertIn('campaign:', report.errors[1][1])
+        self.assertIn('donated_at:', report.errors[2][1])
+        self.assertIn('name:', report.errors[3][1])
+
+        dated = Donation.objects.get(amount=10)
+        self.assertTrue(dated.is_approved)
+        self.assertEqual(timezone.localdate(dated.donated_at).isoformat(), '2024-03-01')
+        self.assertEqual(timezone.localdate(Donation.objects.get(amount=5).donated_at), timezone.localdate())
+
+        # Credited through the ledger and the rollups, as approvals are
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.collected_amount, Decimal('15.00'))
+        self.assertEqual(CampaignContribution.objects.count(), 2)
+        incremental = list(DonationDailyRollup.objects.order_by('day').values('day', *rollups.COUNTERS))
+        rollups.rebuild()
+        self.assertEqual(list(DonationDailyRollup.objects.order_by('day').values('day', *rollups.COUNTERS)), incremental)
+
+    def test_batch_cost_does_not_grow_with_rows(self):
+        imports.import_donations(imports.read_rows(self.sheet(self.row()), 'warm.csv'))  # creates the rollup row
+        with CaptureQueriesContext(connection) as few:
+            imports.import_donations(imports.read_rows(self.sheet(*[self.row()] * 2), 'a.csv'))
+        with CaptureQueriesContext(connection) as many:
+            imports.import_donations(imports.read_rows(self.sheet(*[self.row()] * 50), 'b.csv'))
+        self.assertEqual(len(few), len(many))
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.collected_amount, Decimal('530.00'))
+
+    def test_dry_run_and_unsupported_files(self):
+        with tempfile.NamedTemporaryFile(suffix='.csv') as f:
+            f.write(self.sheet(self.row(), self.row(email='bad')).getvalue())
+            f.flush()
+            out = StringIO()
+            call_command('import_donations', f.name, '--dry-run', stdout=out, stderr=StringIO())
+        self.assertIn('Would import 1 donations; 1 rows rejected', out.getvalue())
+        self.assertFalse(Donation.objects.exists())
+        with self.assertRaises(ValueError):
+            imports.read_rows(BytesIO(), 'camp.ods')
+
+    def test_admin_upload(self):
+        self.client.force_login(self.user)
+        url = reverse('admin:DonationsApp_donation_import')
+        self.assertContains(self.client.get(reverse('admin:DonationsApp_donation_changelist')), url)
+        upload = SimpleUploadedFile('camp.csv', self.sheet(self.row(), self.row(phone='')).getvalue())
+        response = self.client.post(url, {'file': upload})
+        self.assertContains(response, 'Imported 1 donations')
+        self.assertContains(response, '<td>3</td>')
+        self.assertEqual(Donation.objects.count(), 1)
+
+        donor = User.objects.create_user('donor', password='x', is_staff=True)
+        self.client.force_login(donor)
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+    @skipUnless(find_spec('openpyxl'), "openpyxl is not installed")
+    def test_xlsx(self):
+        import openpyxl
+        workbook = openpyxl.Workbook()
+        sheet = workbook.active
+        sheet.append(['Donation Type', 'Name', 'Phone', 'Email', 'Campaign', 'Purpose', 'Amount', 'Donated At'])
+        sheet.append(['goods', 'Camp donor', '1', 'camp@example.com', float(self.campaign.pk), 'Rice', 12.5,
+                      timezone.datetime(2024, 3, 1)])
+        f = BytesIO()
+        workbook.save(f)
+        f.seek(0)
+        report = imports.import_donations(imports.read_rows(f, 'camp.xlsx'))
+        self.assertEqual((report.imported, report.failed), (1, 0))
+        donation = Donation.objects.get()
+        self.assertEqual((donation.donation_type, donation.amount), ('goods', Decimal('12.50')))
+        self.assertEqual(timezone.localdate(donation.donated_at).isoformat(), '2024-03-01')
+
+
+class CampaignCounterTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user('admin', password='x', is_staff=True, is_superuser=True)
+        self.campaign = Campaign.objects.create(
+            title='Meals', description='-', goal_amount=100, created_by=self.admin, category='food',
+        )
+        self.client.force_login(self.admin)
+
+    def counters(self):
+        self.campaign.refresh_from_db()
+        return self.campaign.donor_count, self.campaign.pending_count, self.campaign.last_donation_at
+
+    def donate(self):
+        self.client.post(reverse('donate', args=[self.campaign.pk]), {
+            'donation_type': 'money', 'name': 'Donor', 'phone': '1', 'email': 'donor@example.com',
+            'campaign': self.campaign.pk, 'purpose': 'Meals', 'amount': '10',
+        })
+        return Donation.objects.latest('pk')
+
+    def test_create_approve_and_reject_paths_keep_counters(self):
+        first, second, third = self.donate(), self.donate(), self.donate()
+        self.assertEqual(self.counters(), (0, 3, None))
+
+        approvals.approve_donations([first.pk, second.pk])
+        self.assertEqual(self.counters(), (2, 1, second.donated_at))
+
+        # The admin action, the approval panel and the single-row views share approvals.py
+        self.client.post(reverse('admin:DonationsApp_donation_changelist'), {
+            'action': 'reject_donations', '_selected_action': [second.pk, third.pk],
+        })
+        self.assertEqual(self.counters(), (1, 0, first.donated_at))
+        approvals.reject_donation(first.pk)
+        self.assertEqual(self.counters(), (0, 0, None))
+
+        approvals.approve_donation(third.pk)  # rejected -> approved
+        self.assertEqual(self.counters(), (1, 0, third.donated_at))
+
+        imports.import_donations([(2, {
+            'donation_type': 'goods', 'name': 'Camp', 'phone': '1', 'email': 'camp@example.com',
+            'campaign': str(self.campaign.pk), 'purpose': 'Rice', 'amount': '', 'donated_at': '2020-01-01',
+        })])
+        self.assertEqual(self.counters(), (2, 0, third.donated_at))
+
+    def test_deleting_donations_outside_approvals_keeps_counters(self):
+        first, second, pending = self.donate(), self.donate(), self.donate()
+        approvals.approve_donations([first.pk, second.pk])
+        second.refresh_from_db()
+        self.assertEqual(self.counters(), (2, 1, second.donated_at))
+
+        second.delete()
+        self.assertEqual(self.counters(), (1, 1, first.donated_at))
+        # The admin's delete action deletes through a queryset
+        self.client.post(reverse('admin:DonationsApp_donation_changelist'), {
+            'action': 'delete_selected', '_selected_action': [first.pk, pending.pk], 'post': 'yes',
+        })
+        self.assertEqual(self.counters(), (0, 0, None))
+
+    def test_listing_shows_counters_without_aggregates(self):
+        self.donate()
+        approvals.approve_donation(self.donate().pk)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('category', args=['food']))
+        self.assertContains(response, '1 donor / 1 pending')
+        self.assertFalse([q for q in queries if 'COUNT(' in q['sql'].upper()])
+
+    def test_reconcile_fixes_drift_and_counts_archived_donations(self):
+        old = self.donate()
+        approvals.approve_donation(old.pk)
+        self.donate()
+        Donation.objects.filter(pk=old.pk).update(donated_at=timezone.now() - timezone.timedelta(days=400))
+        old.refresh_from_db()
+        archive.archive(days=365)
+        # Archiving moves the donation; it still counts
+        self.assertEqual(self.counters()[:2], (1, 1))
+        Campaign.objects.update(donor_count=7, pending_count=-1, last_donation_at=None)
+
+        out = StringIO()
+        call_command('reconcile_campaign_counters', '--chunk-size', '1', stdout=out)
+        self.assertIn('Reconciled counters for 1 campaigns', out.getvalue())
+        self.assertEqual(self.counters(), (1, 1, old.donated_at))
+        self.assertEqual(counters.reconcile(), 1)
+        self.assertEqual(self.counters(), (1, 1, old.donated_at))
+
+
+class ApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('donor', password='x')
+        self.other = User.objects.create_user('other', password='x')
+        self.campaigns = [
+            Campaign.objects.create(
+                title=f'Meals {n}', description='-', goal_amount=100, created_by=self.user, category='food',
+            )
+            for n in range(5)
+        ]
+        Campaign.objects.create(title='Books', description='-', goal_amount=50, created_by=self.user, category='education')
+        self.client.force_login(self.user)
+
+    def test_fields_narrow_the_select(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('api_category_campaigns', args=['food']), {'fields': 'title,donor_count'})
+        self.assertEqual(response.status_code, 200)
+        rows = response.json()['results']
+        self.assertEqual(rows[0], {'id': self.campaigns[-1].pk, 'title': 'Meals 4', 'donor_count': 0})
+        self.assertEqual(len(rows), 5)
+        listing = [q['sql'] for q in queries if 'FROM "DonationsApp_campaign"' in q['sql']]
+        self.assertEqual(len(listing), 1)
+        self.assertNotIn('"description"', listing[0])
+
+        response = self.client.get(reverse('api_campaigns'), {'fields': 'title,created_by'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('created_by', response.json()['error'])
+        self.assertEqual(self.client.get(reverse('api_category_campaigns', args=['pets'])).status_code, 404)
+
+    def test_cursors_walk_every_row_once(self):
+        seen, params = [], {'limit': 2, 'fields': 'title'}
+        while True:
+            data = self.client.get(reverse('api_campaigns'), params).json()
+            seen += [row['id'] for row in data['results']]
+            if not data['next_cursor']:
+                break
+            params['after'] = data['next_cursor']
+        self.assertEqual(seen, sorted(Campaign.objects.values_list('pk', flat=True), reverse=True))
+
+        for n in range(5):
+            Donation.objects.create(campaign=self.campaigns[0], user=self.user, name=f'D{n}', amount=n + 1)
+        first = self.client.get(reverse('api_my_donations'), {'limit': 3, 'fields': 'amount'}).json()
+        self.assertEqual([set(row) for row in first['results']], [{'id', 'amount'}] * 3)
+        second = self.client.get(reverse('api_my_donations'), {'limit': 3, 'after': first['next_cursor']}).json()
+        self.assertEqual(len(second['results']), 2)
+        self.assertEqual(second['results'][0]['campaign_title'], 'Meals 0')
+        self.assertIsNone(second['next_cursor'])
+        back = self.client.get(reverse('api_my_donations'), {'limit': 3, 'before': second['prev_cursor']}).json()
+        self.assertEqual([row['id'] for row in back['results']], [row['id'] for row in first['results']])
+
+    def test_etag_revalidation_runs_no_queries(self):
+        donation = Donation.objects.create(campaign=self.campaigns[0], user=self.user, name='Asha', amount=7)
+        approvals.approve_donation(donation.pk)
+        for url_name in ('api_campaigns', 'api_organizations', 'api_approved_donations', 'api_my_donations'):
+            first = self.client.get(reverse(url_name))
+            self.assertEqual(first.status_code, 200, url_name)
+            with self.assertNumQueries(0):
+                response = self.client.get(reverse(url_name), HTTP_IF_NONE_MATCH=first['ETag'])
+            self.assertEqual(response.status_code, 304, url_name)
+
+    def test_own_donations_etag_is_per_user_and_moves_on_change(self):
+        first = self.client.get(reverse('api_my_donations'))
+        with self.captureOnCommitCallbacks(execute=True):
+            donation = Donation.objects.create(campaign=self.campaigns[0], user=self.user, name='Asha', amount=7)
+        response = self.client.get(reverse('api_my_donations'), HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['is_approved'], False)
+
+        current = response['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            approvals.approve_donation(donation.pk)
+        response = self.client.get(reverse('api_my_donations'), HTTP_IF_NONE_MATCH=current)
+        self.assertEqual(response.json()['results'][0]['is_approved'], True)
+
+        self.client.force_login(self.other)
+        response = self.client.get(reverse('api_my_donations'), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'], [])
+
+    def test_donation_etags_move_when_a_campaign_is_renamed(self):
+        donation = Donation.objects.create(campaign=self.campaigns[0], user=self.user, name='Asha', amount=7)
+        approvals.approve_donation(donation.pk)
+        etags = {url_name: self.client.get(reverse(url_name))['ETag']
+                 for url_name in ('api_approved_donations', 'api_my_donations')}
+        with self.captureOnCommitCallbacks(execute=True):
+            self.campaigns[0].title = 'Hot meals'
+            self.campaigns[0].save()
+        for url_name, etag in etags.items():
+            response = self.client.get(reverse(url_name), HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200, url_name)
+            self.assertEqual(response.json()['results'][0]['campaign_title'], 'Hot meals')
+
+    def test_donation_endpoints_need_a_login(self):
+        self.client.logout()
+        for url_name in ('api_approved_donations', 'api_my_donations'):
+            response = self.client.get(reverse(url_name))
+            self.assertEqual(response.status_code, 401)
+            self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(self.client.get(reverse('api_campaigns')).status_code, 200)
+        self.assertEqual(self.client.post(reverse('api_campaigns')).status_code, 405)
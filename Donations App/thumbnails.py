@@ -0,0 +1,83 @@
+import hashlib
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+VARIANT_DIR = 'organization_images/variants/'
+# Dashboard cards show logos at max-height 200px: 1x and 2x (retina) boxes
+SIZES = {'1x': 200, '2x': 400}
+FORMATS = {
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 6},
+    'jpeg': {'format': 'JPEG', 'quality': 82, 'optimize': True, 'progressive': True},
+}
+
+
+def _encode(image, ext):
+    options = dict(FORMATS[ext])
+    fmt = options.pop('format')
+    if fmt == 'JPEG' and image.mode != 'RGB':
+        # No alpha in JPEG: flatten onto the white card background
+        rgba = image.convert('RGBA')
+        flat = Image.new('RGB', rgba.size, (255, 255, 255))
+        flat.paste(rgba, mask=rgba.getchannel('A'))
+        image = flat
+    out = BytesIO()
+    image.save(out, fmt, **options)
+    return out.getvalue()
+
+
+def build_variants(field_file):
+    """Write resized WebP/JPEG copies of an image and return their storage names.
+
+    Names are derived from a hash of the original's bytes, so re-uploading the
+    same logo (e.g. TTD.jpg vs TTD_Pnp3Q6f.jpg) reuses the variants already on
+    disk instead of writing new ones.
+    """
+    storage = field_file.storage
+    with field_file.open('rb') as f:
+        data = f.read()
+    digest = hashlib.sha256(data).hexdigest()[:24]
+
+    variants = {'source': field_file.name}
+    source = None
+    for ext in FORMATS:
+        variants[ext] = {}
+        for density, box in SIZES.items():
+            name = f"{VARIANT_DIR}{digest}-{box}.{ext}"
+            if not storage.exists(name):
+                if source is None:
+                    source = ImageOps.exif_transpose(Image.open(BytesIO(data)))
+                image = source.copy()
+                image.thumbnail((box, box), Image.LANCZOS)
+                name = storage.save(name, ContentFile(_encode(image, ext)))
+            variants[ext][density] = name
+    return variants
+
+
+def _store(organization, variants):
+    # queryset update: no post_save, so this doesn't re-enter the signal handler
+    type(organization).objects.filter(pk=organization.pk).update(image_variants=variants)
+    organization.image_variants = variants
+
+
+def clear_variants(organization):
+    """Record that the current image has no variants (build_image_variants --force retries it)."""
+    _store(organization, {'source': organization.image.name} if organization.image else {})
+
+
+def ensure_variants(organization, force=False):
+    """Build variants for the organization's current image if they are stale.
+
+    Returns True if the stored variants changed.
+    """
+    if not organization.image:
+        variants = {}
+    elif not force and organization.image_variants.get('source') == organization.image.name:
+        return False
+    else:
+        variants = build_variants(organization.image)
+    if variants == organization.image_variants:
+        return False
+    _store(organization, variants)
+    return True
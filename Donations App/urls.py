@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import api, views
 
 urlpatterns = [
     path('register/', views.register, name='register'),
@@ -9,18 +9,26 @@ urlpatterns = [
     path('create/delete/<int:campaign_id>/', views.delete_campaign_view, name='delete_campaign'),
     path('my-donations/', views.my_donations_view, name='my_donations'),
     path('all-donations/', views.all_donations_view, name='all_donations'),
+    path('all-donations/export/', views.export_donations, name='export_donations'),
+    path('statistics/', views.statistics_view, name='statistics'),
+    path('statistics/data/', views.statistics_data, name='statistics_data'),
     path("donations_list/", views.donations_list, name="donations_list"),
     path('delete-campaign/<int:campaign_id>/', views.delete_campaign_view, name='delete_campaign'),
     path('edit-campaign/<int:campaign_id>/', views.edit_campaign_view, name='edit_campaign'),
     path('profile/', views.profile_view, name='profile'),
     path('dashboard/', views.dashboard, name='dashboard'),
     path('profile/edit/', views.edit_profile, name='edit_profile'),
-    path('education/', views.education_view, name='education'),
-    path('food/', views.food_view, name='food'),
-    path('clothes/', views.clothes_view, name='clothes'),
-    path('medical/', views.medical_view, name='medical'),
-    path('infrastructure/', views.infrastructure_view, name='infrastructure'),
-    path('shelter/', views.shelter_view, name='shelter'),
+    path('campaigns/search/', views.search_campaigns, name='search_campaigns'),
+    path('campaigns/suggest/', views.campaign_suggest, name='campaign_suggest'),
+    path('campaigns/progress/', views.campaign_progress, name='campaign_progress'),
+    path('campaigns/<slug:category>/', views.category_view, name='category'),
+    # Original per-category URLs, kept so existing links and bookmarks work
+    path('education/', views.category_view, {'category': 'education'}, name='education'),
+    path('food/', views.category_view, {'category': 'food'}, name='food'),
+    path('clothes/', views.category_view, {'category': 'clothes'}, name='clothes'),
+    path('medical/', views.category_view, {'category': 'medical'}, name='medical'),
+    path('infrastructure/', views.category_view, {'category': 'infrastructure'}, name='infrastructure'),
+    path('shelter/', views.category_view, {'category': 'shelter'}, name='shelter'),
     path('donate/<int:campaign_id>/', views.donation_view, name='donate'),
     path('thankyou/', views.thankyou, name='thankyou'),
     path('approved_donations/', views.approved_donations, name='approved_list'),
@@ -29,11 +37,19 @@ urlpatterns = [
     path('admin-approval/', views.admin_approval_panel, name='admin_approval_panel'),
     path('approve/<int:donation_id>/', views.approve_donation, name='approve_donation'),
     path('reject/<int:donation_id>/', views.reject_donation, name='reject_donation'),
+    path('approval/bulk/', views.bulk_settle_donations, name='bulk_settle_donations'),
     path('reply/<int:query_id>/', views.reply_to_query, name='reply_to_query'),
     path('request-assistance/', views.request_assistance, name='request_assistance'),
     path('recipient-requests/', views.admin_recipient_requests, name='admin_recipient_requests'),
+    path('recipient-requests/<int:request_id>/<str:field>/', views.recipient_document, name='recipient_document'),
     path('approve_request/<int:request_id>/', views.approve_recipient_request, name='approve_recipient_request'),
     path('reject_request/<int:request_id>/', views.reject_recipient_request, name='reject_recipient_request'),
     path('request/', views.recipient_request_form, name='recipient_request_form'),
     path('my_request_status/', views.my_request_status, name='my_request_status'),
+    # Read-only JSON API
+    path('api/v1/campaigns/', api.campaigns, name='api_campaigns'),
+    path('api/v1/campaigns/<slug:category>/', api.campaigns, name='api_category_campaigns'),
+    path('api/v1/organizations/', api.organizations, name='api_organizations'),
+    path('api/v1/donations/approved/', api.approved_donations, name='api_approved_donations'),
+    path('api/v1/me/donations/', api.my_donations, name='api_my_donations'),
 ]
\ No newline at end of file
@@ -1,11 +1,17 @@
 from django.contrib.admin.views.decorators import staff_member_required
 from django.shortcuts import get_object_or_404,render, redirect
 from .forms import UserRegisterForm, ProfileForm, CampaignForm, DonationForm,ContactForm, ReplyForm,RecipientRequestForm
-from .models import Campaign, Donation,Profile, ContactQuery,Organization, RecipientRequest
-from django.http import HttpResponse
+from .models import Campaign, Donation,Profile, ContactQuery, RecipientRequest
+from django.http import Http404, HttpResponse, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
 from django.contrib import messages
-from django.core.mail import send_mail
-from decimal import Decimal
+from django.db import transaction
+from django.db.models import ProtectedError
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from asgiref.sync import sync_to_async
+from . import accounts, approvals, archive, asyncauth, caching, documents, exports, outbox, rollups, search
+from .conditional import conditional
+from .pagination import apaginate_across, paginate
+from .querybudget import query_budget
 
 from django.contrib.auth import login
 from django.conf import settings
@@ -33,20 +39,21 @@ def register(request):
 @login_required
 def profile_view(request):
     # Create a profile if it doesn't exist
-    profile, created = Profile.objects.get_or_create(user=request.user)
+    profile = request.profile or Profile.objects.get_or_create(user=request.user)[0]
     return render(request, 'profile.html', {'profile': profile})
+@query_budget(4)
 @login_required
 def dashboard(request):
-    try:
-        profile = request.user.profile
-    except Profile.DoesNotExist:
+    profile = request.profile  # cached by accounts.ProfileMiddleware
+    if not profile:
         return redirect('complete_profile')
 
-    organizations = Organization.objects.all()
-
     context = {
         'profile': profile,
-        'organizations': organizations,
+        # Passed uncalled: the template only calls it when the cached cards are cold
+        'organizations': caching.organizations,
+        'organizations_version': caching.organizations_version(),
+        'organizations_timeout': caching.ORGANIZATIONS_TIMEOUT,
     }
 
     if profile.role == 'admin':
@@ -60,7 +67,8 @@ def dashboard(request):
 
 @login_required
 def edit_profile(request):
-    profile = request.user.profile
+    # Saving the profile drops its cached copy (see signals.profile_changed)
+    profile = request.profile if request.method == 'GET' else Profile.objects.get(user=request.user)
     original_role = profile.role
 
     if request.method == 'POST':
@@ -96,11 +104,18 @@ def create_campaign(request):
 def delete_campaign_view(request, campaign_id):
     campaign = get_object_or_404(Campaign, id=campaign_id)
     if request.method == 'POST':
-        if campaign.donation_set.exists():
-            messages.error(request, "Cannot delete. Donations already exist for this campaign.")
-        else:
-            campaign.delete()
+        # Archived donations count too (see Campaign.has_donations)
+        deleted = not campaign.has_donations()
+        if deleted:
+            try:
+                campaign.delete()
+            except ProtectedError:
+                # A donation was archived or credited since the check
+                deleted = False
+        if deleted:
             messages.success(request, f"Campaign '{campaign.title}' has been deleted.")
+        else:
+            messages.error(request, "Cannot delete. Donations already exist for this campaign.")
         return redirect('dashboard')
     
     return render(request, 'delete_campaign.html', {'campaign': campaign})
@@ -136,16 +151,66 @@ def edit_campaign_view(request, campaign_id):
 #     return render(request, 'donate.html', {'form': form})
 
 
-@login_required
-def my_donations_view(request):
-    donations = Donation.objects.filter(user=request.user)
-    return render(request, 'my_donations.html', {'donations': donations})
+# The read-only listings and the donate flow are async views: under ASGI they
+# wait on the database without holding a worker thread. Under WSGI Django runs
+# them through async_to_sync, so the same URLs keep working there too.
+
+@query_budget(4)  # one page query each on the hot and archive tables
+@asyncauth.login_required
+async def my_donations_view(request):
+    donations = [qs.select_related('campaign') for qs in archive.querysets(user=request.user)]
+    page = await apaginate_across(request, donations, 'donated_at')
+    return render(request, 'my_donations.html', {'donations': page, 'page': page})
 
 
-@staff_member_required  # Only allow admin/staff to view
-def all_donations_view(request):
-    donations = Donation.objects.select_related('donor', 'campaign').order_by('-donated_at')
-    return render(request, 'all_donations.html', {'donations': donations})
+@query_budget(4)  # one page query each on the hot and archive tables
+@asyncauth.staff_member_required  # Only allow admin/staff to view
+async def all_donations_view(request):
+    donations = [qs.select_related('user', 'campaign') for qs in archive.querysets()]
+    page = await apaginate_across(request, donations, 'donated_at')
+    return render(request, 'all_donations.html', {'donations': page, 'page': page})
+
+@staff_member_required
+def export_donations(request):
+    """Stream donations as CSV or NDJSON: ?format=csv|ndjson&start=&end=&status="""
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in exports.FORMATS:
+        return HttpResponseBadRequest("format must be csv or ndjson")
+    try:
+        filters = exports.parse_filters(request.GET)
+    except ValueError as exc:
+        return HttpResponseBadRequest(str(exc))
+
+    content_type = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    response = StreamingHttpResponse(
+        exports.stream(fmt, exports.donation_rows(**filters)),
+        content_type=f'{content_type}; charset=utf-8',
+    )
+    response['Content-Disposition'] = f'attachment; filename="donations.{fmt}"'
+    return response
+
+def _report_days(request):
+    try:
+        return min(max(int(request.GET.get('days', 30)), 1), 366)
+    except ValueError:
+        return 30
+
+
+@query_budget(5)
+@staff_member_required
+def statistics_view(request):
+    days = _report_days(request)
+    return render(request, 'statistics.html', {
+        'days': days,
+        'day_options': (7, 30, 90, 365),
+        **rollups.statistics(days),
+    })
+
+
+@query_budget(5)
+@staff_member_required
+def statistics_data(request):
+    return JsonResponse(rollups.statistics(_report_days(request)))
 
 # views.py
 @staff_member_required
@@ -203,72 +268,98 @@ def donations_list(request):
     return render(request, "donations_list.html", {"donations": donations})
 
 
-@login_required
-def education_view(request):
-    campaigns = Campaign.objects.filter(category='education')
-    return render(request, 'education.html', {'campaigns': campaigns})
-
-@login_required
-def food_view(request):
-    campaigns = Campaign.objects.filter(category='food')
-    return render(request, 'food.html', {'campaigns': campaigns})
-
-@login_required
-def clothes_view(request):
-    campaigns = Campaign.objects.filter(category='clothes')
-    return render(request, 'clothes.html', {'campaigns': campaigns})
-
-@login_required
-def medical_view(request):
-    campaigns = Campaign.objects.filter(category='medical')
-    return render(request, 'medical.html', {'campaigns': campaigns})
+@query_budget(3)
+@asyncauth.login_required
+@conditional(caching.category_version)
+async def category_view(request, category):
+    if category not in caching.CATEGORIES:
+        raise Http404("Unknown campaign category")
+    return render(request, 'category.html', {
+        'category': category,
+        'category_label': caching.CATEGORIES[category],
+        'campaign_list': await caching.acampaign_list_html(category, request.user),
+    })
 
-@login_required
-def infrastructure_view(request):
-    campaigns = Campaign.objects.filter(category='infrastructure')
-    return render(request, 'infrastructure.html', {'campaigns': campaigns})
+def campaign_progress(request):
+    # The live feed is progress.sse_app, which asgi.py mounts at this URL.
+    # Requests only get here without it (runserver, WSGI), and a 204 tells
+    # EventSource not to reconnect.
+    return HttpResponse(status=204)
 
+@query_budget(4)
 @login_required
-def shelter_view(request):
-    campaigns = Campaign.objects.filter(category='shelter')
-    return render(request, 'shelter.html', {'campaigns': campaigns})
+def search_campaigns(request):
+    """Full-text campaign search: ?q=words&category=&page="""
+    query = request.GET.get('q', '').strip()
+    category = request.GET.get('category')
+    if category not in caching.CATEGORIES:
+        category = None
+    try:
+        page = min(max(int(request.GET.get('page', 1)), 1), 100)
+    except ValueError:
+        page = 1
+    found = search.search(query, category, page)
+    matched = found['facets'].get(category, 0) if category else found['total']
+    facets = [(key, label, found['facets'][key]) for key, label in caching.CATEGORIES.items() if key in found['facets']]
+    return render(request, 'search.html', {
+        'query': query,
+        'category': category,
+        'campaigns': found['results'],
+        'total': found['total'],
+        'facets': facets,
+        'page': page,
+        'has_next': page * search.PER_PAGE < matched,
+    })
 
-@login_required
-def donation_view(request, campaign_id):
+@asyncauth.login_required
+async def donation_view(request, campaign_id):
+    campaign = None
     if campaign_id:
-        campaign = get_object_or_404(Campaign, id=campaign_id)
-    else:
-        campaign = None
-    try:
-        profile = Profile.objects.get(user=request.user)
-        phone_number = profile.phone
-    except Profile.DoesNotExist:
-        phone_number = ''
+        campaign = await Campaign.objects.filter(id=campaign_id).afirst()
+        if campaign is None:
+            raise Http404("No Campaign matches the given query.")
+    profile = await accounts.acached_profile(request.user)
+    phone_number = profile.phone if profile else ''
     if request.method == 'POST':
-        form = DonationForm(request.POST)
-        if form.is_valid():
+        form = DonationForm(request.POST, campaign=campaign)
+        # Only queries if the donor picked a campaign other than the URL's
+        if await sync_to_async(form.is_valid)():
             donation = form.save(commit=False)
             donation.user = request.user  # ✅ Ensure user is saved if your Donation model has user field
-            donation.save()
+            await donation.asave()
             return render(request, 'thankyou.html', {'donation': donation})  # ✅ Show thankyou.html
     else:
-        form = DonationForm(initial={'campaign': campaign,
+        form = DonationForm(campaign=campaign, initial={'campaign': campaign,
             'name': request.user.username,
             'email': request.user.email,
-            'phone': phone_number,   
-            'purpose': campaign.description,             
+            'phone': phone_number,
+            'purpose': campaign.description if campaign else '',
             })
 
     return render(request, 'donate.html', {'form': form, 'campaign': campaign})
 
+@query_budget(3)
+@login_required
+def campaign_suggest(request):
+    """Search-as-you-type for the donate page's campaign picker: ?q="""
+    results = [
+        {'id': c.pk, 'title': c.title, 'category': c.category}
+        for c in search.suggest(request.GET.get('q', ''))
+    ]
+    response = JsonResponse({'results': results})
+    response['Cache-Control'] = 'private, max-age=60'
+    return response
+
 @login_required
 def thankyou(request):
     return render(request,'thankyou.html')
 
-@login_required
-def approved_donations(request):
-    donations = Donation.objects.filter(is_approved=True, is_rejected=False)
-    return render(request, 'approved_list.html', {'donations': donations})
+@query_budget(4)  # one page query each on the hot and archive tables
+@asyncauth.login_required
+@conditional(caching.approved_version)
+async def approved_donations(request):
+    page = await apaginate_across(request, archive.querysets(is_approved=True, is_rejected=False), 'donated_at')
+    return render(request, 'approved_list.html', {'donations': page, 'page': page})
 
 @login_required
 def contact_admin(request):
@@ -292,10 +383,11 @@ def contact_admin(request):
         'user_email': request.user.email,
     })
 
+@query_budget(3)
 @staff_member_required
 def view_queries(request):
-    queries = ContactQuery.objects.all().order_by('-sent_at')
-    return render(request, 'view_queries.html', {'queries': queries})
+    page = paginate(request, ContactQuery.objects.all(), 'sent_at')
+    return render(request, 'view_queries.html', {'queries': page, 'page': page})
 
 @staff_member_required
 def reply_to_query(request, query_id):
@@ -308,13 +400,12 @@ def reply_to_query(request, query_id):
             message = form.cleaned_data['message']
             recipient_email = query.email
 
-            # Sending email
-            send_mail(
+            # Queued; delivered by the send_outbox worker
+            outbox.queue_mail(
                 subject,
                 message,
                 request.user.email,  # Admin's email as sender
                 [recipient_email],
-                fail_silently=False,
             )
 
             messages.success(request, 'Reply sent successfully.')
@@ -323,98 +414,114 @@ def reply_to_query(request, query_id):
         form = ReplyForm(initial={'subject': f"Re: {query.subject}"})
 
     return render(request, 'reply_to_query.html', {'form': form, 'query': query})
+@query_budget(3)
 @staff_member_required
 def admin_approval_panel(request):
-    donations = Donation.objects.filter(is_approved=False, is_rejected=False)
-    return render(request, 'admin_approval_panel.html', {'donations': donations})
+    donations = Donation.objects.filter(is_approved=False, is_rejected=False).select_related('campaign')
+    page = paginate(request, donations, 'donated_at')
+    return render(request, 'admin_approval_panel.html', {'donations': page, 'page': page})
 
+@csrf_exempt  # CSRF is checked in _submit_recipient_request, after the upload handler is set
 @login_required
 def request_assistance(request):
-    if request.method == 'POST':
-        form = RecipientRequestForm(request.POST)
-        if form.is_valid():
-            instance = form.save(commit=False)
-            instance.user = request.user
-            instance.save()
-            messages.success(request, "Request submitted. Awaiting admin verification.")
-            return redirect('dashboard')
-    else:
-        form = RecipientRequestForm()
-
-    return render(request, 'recipient_request_form.html', {'form': form})
+    request.upload_handlers = [documents.DocumentUploadHandler(request)]
+    return _submit_recipient_request(request, "Request submitted. Awaiting admin verification.")
 
 # ✅ Approve Donation
 @staff_member_required
 def approve_donation(request, donation_id):
-    donation = get_object_or_404(Donation, id=donation_id)
-    donation.is_approved = True
-    donation.is_rejected = False
-    donation.save()
-    if donation.amount:
-            campaign = donation.campaign
-            campaign.collected_amount += Decimal(donation.amount)
-            campaign.save()
-    send_mail(
-        'Donation Approved ✅',
-        f'Dear {donation.name},\n\nThank you for your generous donation towards {donation.campaign.title}. Your donation has been approved.\n\nRegards,\nDonations Team',
-        settings.EMAIL_HOST_USER,
-        [donation.email],
-        fail_silently=False,
-    )
+    get_object_or_404(Donation, id=donation_id)
+    # No-op if already approved (e.g. by another admin)
+    approvals.approve_donation(donation_id)
     return redirect('admin_approval_panel')
 
 # ✅ Reject Donation
 @staff_member_required
 def reject_donation(request, donation_id):
-    donation = get_object_or_404(Donation, id=donation_id)
-    donation.is_approved = False
-    donation.is_rejected = True
-    donation.save()
-
-    # ✅ Send rejection mail
-    send_mail(
-        'Donation Rejected ❌',
-        f'Dear {donation.name},\n\nUnfortunately, your donation towards {donation.campaign.title} has been rejected. For any queries, please contact us.\n\nRegards,\nDonations Team',
-        settings.EMAIL_HOST_USER,
-        [donation.email],
-        fail_silently=False,
-    )
+    get_object_or_404(Donation, id=donation_id)
+    approvals.reject_donation(donation_id)
+    return redirect('admin_approval_panel')
 
+# ✅ Approve/Reject the donations ticked on the approval panel
+@staff_member_required
+def bulk_settle_donations(request):
+    if request.method != 'POST':
+        return redirect('admin_approval_panel')
+    donation_ids = [int(i) for i in request.POST.getlist('donation_ids') if i.isdigit()]
+    action = request.POST.get('action')
+    if action == 'approve':
+        settled = approvals.approve_donations(donation_ids)
+        messages.success(request, f"{len(settled)} donation(s) approved.")
+    elif action == 'reject':
+        settled = approvals.reject_donations(donation_ids)
+        messages.error(request, f"{len(settled)} donation(s) rejected.")
     return redirect('admin_approval_panel')
 
 
+@csrf_exempt  # CSRF is checked in _submit_recipient_request, after the upload handler is set
 @login_required
 def recipient_request_form(request):
+    request.upload_handlers = [documents.DocumentUploadHandler(request)]
+    return _submit_recipient_request(request)
+
+@csrf_protect
+def _submit_recipient_request(request, success_message=None):
+    # Uploads stream to disk through documents.DocumentUploadHandler and are
+    # stored content-addressed, so resubmitting the same scan stores nothing new
     if request.method == 'POST':
+        request.FILES  # parse the body, which is when the upload handler runs
+        if getattr(request, 'upload_too_large', False):
+            # The body was only partly read, so there is nothing to re-bind
+            limit = documents.max_upload_size() // (1024 * 1024)
+            return render(request, 'recipient_request_form.html', {
+                'form': RecipientRequestForm(),
+                'upload_error': f"Each document must be {limit} MB or smaller.",
+            }, status=413)
         form = RecipientRequestForm(request.POST, request.FILES)
         if form.is_valid():
             recipient_request = form.save(commit=False)
             recipient_request.user = request.user
             recipient_request.save()
+            if success_message:
+                messages.success(request, success_message)
             return redirect('dashboard')  # or any success page
     else:
         form = RecipientRequestForm()
-    
+
     return render(request, 'recipient_request_form.html', {'form': form})
 
+@login_required
+def recipient_document(request, request_id, field):
+    """A recipient's uploaded document, for its owner and for staff."""
+    if field not in ('aadhaar_file', 'ration_card_file'):
+        raise Http404("Unknown document")
+    recipient_request = get_object_or_404(RecipientRequest, id=request_id)
+    if recipient_request.user_id != request.user.id and not request.user.is_staff:
+        raise Http404("Unknown document")
+    document = getattr(recipient_request, field)
+    if not document:
+        raise Http404("No document uploaded")
+    return documents.serve(document)
+
+@query_budget(3)
 @staff_member_required
 def admin_recipient_requests(request):
-    requests = RecipientRequest.objects.all()
-    return render(request, 'admin_recipient_requests.html', {'requests': requests})
+    page = paginate(request, RecipientRequest.objects.select_related('user'), 'created_at')
+    return render(request, 'admin_recipient_requests.html', {'requests': page, 'page': page})
 
 @staff_member_required
 def approve_recipient_request(request, request_id):
     req = get_object_or_404(RecipientRequest, id=request_id)
     req.is_approved = True
     req.is_rejected = False
-    req.save()
-    send_mail(
-        'Request Approved',
-        'Your request has been approved by the admin.',
-        settings.DEFAULT_FROM_EMAIL,
-        [req.user.email],
-        fail_silently=False
-    )
+    with transaction.atomic():
+        req.save()
+        outbox.queue_mail(
+            'Request Approved',
+            'Your request has been approved by the admin.',
+            settings.DEFAULT_FROM_EMAIL,
+            [req.user.email],
+        )
     messages.success(request, "Request approved and user notified.")
     return redirect('admin_recipient_requests')
 
@@ -424,19 +531,21 @@ def reject_recipient_request(request, request_id):
     req = get_object_or_404(RecipientRequest, id=request_id)
     req.is_approved = False
     req.is_rejected = True
-    req.save()
-    send_mail(
-        'Request Rejected',
-        'Your request has been rejected by the admin.',
-        settings.DEFAULT_FROM_EMAIL,
-        [req.user.email],
-        fail_silently=False
-    )
+    with transaction.atomic():
+        req.save()
+        outbox.queue_mail(
+            'Request Rejected',
+            'Your request has been rejected by the admin.',
+            settings.DEFAULT_FROM_EMAIL,
+            [req.user.email],
+        )
     messages.error(request, "Request rejected and user notified.")
     return redirect('admin_recipient_requests')
 
 
+@query_budget(3)
 @login_required
 def my_request_status(request):
-    my_requests = RecipientRequest.objects.filter(user=request.user).order_by('-created_at')  # latest first
-    return render(request, 'recipient_request_status.html', {'my_requests': my_requests})
+    # latest first
+    page = paginate(request, RecipientRequest.objects.filter(user=request.user), 'created_at')
+    return render(request, 'recipient_request_status.html', {'my_requests': page, 'page': page})
@@ -12,5 +12,20 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'DonationsProject.settings')
+# Read by settings: no persistent database connections under ASGI
+os.environ.setdefault('DJANGO_ASGI', '1')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported once the app registry is ready
+from DonationsApp import progress  # noqa: E402
+
+# The live campaign progress feed (Server-Sent Events) is served outside
+# Django's request handling; see progress.sse_app
+PROGRESS_PATH = progress.stream_path()
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'http' and scope['path'] == PROGRESS_PATH:
+        return await progress.sse_app(scope, receive, send)
+    return await django_application(scope, receive, send)
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -22,13 +23,19 @@ LOGIN_URL = '/login/'
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/4.2/howto/deployment/checklist/
 
+# DJANGO_ENV=production switches off debug and turns on the cached template
+# loader; everything else stays as in development.
+PRODUCTION = os.environ.get('DJANGO_ENV') == 'production'
+
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = 'django-insecure-e^oezd_31cxst)b5x_+@!n27ydg6lm$=s4+d=j3wjqxy0z#o0d'
+SECRET_KEY = os.environ.get(
+    'DJANGO_SECRET_KEY', 'django-insecure-e^oezd_31cxst)b5x_+@!n27ydg6lm$=s4+d=j3wjqxy0z#o0d'
+)
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = not PRODUCTION
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = os.environ.get('DJANGO_ALLOWED_HOSTS', '').split() if PRODUCTION else []
 
 
 # Application definition
@@ -45,10 +52,12 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'DonationsApp.querybudget.QueryBudgetMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'DonationsApp.accounts.ProfileMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -71,20 +80,107 @@ TEMPLATES = [
     },
 ]
 
+if PRODUCTION:
+    # Parse each template once per process instead of on every render
+    TEMPLATES[0]['APP_DIRS'] = False
+    TEMPLATES[0]['OPTIONS']['loaders'] = [
+        ('django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]),
+    ]
+
 WSGI_APPLICATION = 'DonationsProject.wsgi.application'
 
 
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
-
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# DJANGO_DB_PROFILE selects the backend: 'sqlite' (default) or 'postgres'.
+
+DB_PROFILE = os.environ.get('DJANGO_DB_PROFILE', 'sqlite')
+
+# Persistent connections pay off under WSGI, where a worker thread reuses its
+# connection request after request. Under ASGI (asgi.py sets DJANGO_ASGI)
+# queries run on whichever thread is free and connections are never reused
+# or reliably closed, so Django's docs say to disable them: keep
+# DB_CONN_MAX_AGE at 0 there.
+CONN_MAX_AGE = int(os.environ.get('DB_CONN_MAX_AGE', 0 if os.environ.get('DJANGO_ASGI') else 600))
+
+if DB_PROFILE == 'postgres':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('POSTGRES_DB', 'donations'),
+            'USER': os.environ.get('POSTGRES_USER', 'donations'),
+            'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+            'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+            'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+            # Keep connections open between requests instead of reconnecting
+            # each time (WSGI only, see above), and check them before reuse.
+            'CONN_MAX_AGE': CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            # Set POSTGRES_PGBOUNCER=1 when connecting through PgBouncer in
+            # transaction pooling mode, which can't hold server-side cursors.
+            'DISABLE_SERVER_SIDE_CURSORS': os.environ.get('POSTGRES_PGBOUNCER') == '1',
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+            # Seconds a writer waits for the lock before "database is locked"
+            'OPTIONS': {'timeout': 20},
+            'CONN_MAX_AGE': CONN_MAX_AGE,
+            # File-backed test DB: the default in-memory one uses shared-cache table
+            # locks that fail instantly instead of waiting, which breaks threaded tests.
+            'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
+        }
     }
+
+# Applied to every new SQLite connection by DonationsApp.signals. WAL lets
+# readers run alongside the single writer; NORMAL sync is safe under WAL.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -32000,  # KiB
+    'temp_store': 'memory',
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# The local-memory cache is per process. When running several worker
+# processes set DJANGO_CACHE_DIR so they share a file-based cache and see
+# each other's invalidations.
+
+if os.environ.get('DJANGO_CACHE_DIR'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ['DJANGO_CACHE_DIR'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'donations-portal',
+        }
+    }
+
+# Sessions and the logged-in user are read on every request, so both come
+# from the cache when warm. cached_db still writes sessions through to the
+# database; the backend caches only the per-request user lookup.
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+AUTHENTICATION_BACKENDS = [
+    'DonationsApp.accounts.CachedModelBackend',
+    # Sessions from before the cached backend name this one; keep them valid
+    'django.contrib.auth.backends.ModelBackend',
+]
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -121,6 +217,21 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+
+# Recipient verification documents
+# Uploads are capped per file and stored content-addressed under
+# MEDIA_ROOT/documents/ (see DonationsApp.documents). Behind nginx set
+# DOCUMENT_SENDFILE_HEADER=X-Accel-Redirect with an internal location at
+# DOCUMENT_SENDFILE_PREFIX aliased to MEDIA_ROOT; behind Apache use X-Sendfile.
+
+DOCUMENT_MAX_UPLOAD_SIZE = int(os.environ.get('DOCUMENT_MAX_UPLOAD_SIZE', 10 * 1024 * 1024))
+DOCUMENT_SENDFILE_HEADER = os.environ.get('DOCUMENT_SENDFILE_HEADER') or None
+DOCUMENT_SENDFILE_PREFIX = '/protected/'
+
+# Approved and rejected donations older than this many days are moved out of
+# the hot Donation table by `manage.py archive_donations` (run it from cron).
+DONATION_ARCHIVE_AFTER_DAYS = int(os.environ.get('DONATION_ARCHIVE_AFTER_DAYS', 365))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 